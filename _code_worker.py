@@ -0,0 +1,135 @@
+# TORIS AI - Persistent Python Code Worker
+#
+# Started once by Tools.execute_code and kept alive so each snippet skips the
+# interpreter start-up. Every snippet runs in a forked child whose fds 0/1/2
+# are redirected away from the protocol pipe, so output written at the fd level
+# (os.system, subprocesses, C extensions) cannot corrupt the framing, and any
+# state the snippet changes (cwd, sys.modules, environment) dies with the child.
+#
+# Protocol over the original stdin/stdout:
+#   request:  10-digit byte length + UTF-8 source
+#   response: 1-digit status (0 ok, 1 error, 2 timed out) + 10-digit byte length + UTF-8 output
+#
+# POSIX only (needs os.fork); Tools falls back to one interpreter per snippet elsewhere.
+
+import os
+import signal
+import sys
+import tempfile
+import traceback
+
+HEADER_SIZE = 10
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_TIMEOUT = 2
+
+
+def _read_exact(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _run_child(code, devnull, out, err):
+    """Body of the forked child; never returns"""
+    status = STATUS_OK
+    try:
+        os.setpgid(0, 0)  # Own process group, so leftovers can be killed as a unit
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        os.dup2(devnull, 0)
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            exec(compile(code, "<snippet>", "exec"), {"__name__": "__main__"})
+        except SystemExit as e:
+            # Mirror the interpreter: None/0 is success, anything else is an error
+            if e.code not in (None, 0):
+                status = STATUS_ERROR
+                if not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+        except BaseException:
+            status = STATUS_ERROR
+            traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(status)
+
+
+def _kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def main():
+    timeout = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    stdin = sys.stdin.buffer
+    # Keep a private handle on the protocol pipe, then point fd 1/2 away from it
+    proto = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+
+    running = {"pid": None, "timed_out": False}
+
+    def on_alarm(signum, frame):
+        if running["pid"] is not None:
+            running["timed_out"] = True
+            _kill_group(running["pid"])
+
+    signal.signal(signal.SIGALRM, on_alarm)
+
+    while True:
+        header = _read_exact(stdin, HEADER_SIZE)
+        if header is None:
+            break
+        code = _read_exact(stdin, int(header))
+        if code is None:
+            break
+
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            child = os.fork()
+            if child == 0:
+                _run_child(code, devnull, out, err)
+
+            # Also set the group here, so a kill cannot race the child's own setpgid
+            try:
+                os.setpgid(child, child)
+            except OSError:
+                pass
+            running["pid"], running["timed_out"] = child, False
+            signal.alarm(timeout)
+            try:
+                _, wait_status = os.waitpid(child, 0)
+            finally:
+                signal.alarm(0)
+
+            # Reap anything the snippet left running in the background
+            _kill_group(child)
+            running["pid"] = None
+
+            if running["timed_out"]:
+                status, source = STATUS_TIMEOUT, None
+            elif os.WIFEXITED(wait_status) and os.WEXITSTATUS(wait_status) == STATUS_OK:
+                status, source = STATUS_OK, out
+            else:
+                status, source = STATUS_ERROR, err
+
+            payload = b""
+            if source is not None:
+                source.seek(0)
+                payload = source.read()
+
+        proto.write(f"{status}{len(payload):010d}".encode("ascii"))
+        proto.write(payload)
+        proto.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 import os
 import json
 import time
-from memory_manager import Memory
+from memory_manager import get_memory
 from tools import Tools
 
 class Agent:
@@ -16,9 +16,11 @@ class Agent:
         """Initialize agent with specified type and model"""
         self.agent_type = agent_type
         self.model = model
-        self.memory = Memory(memory_dir)
+        self.memory = get_memory(memory_dir)
         self.tools = Tools(memory_dir)
         
+        self._system_prompt = None  # Resolved on first use, reset when the agent type changes
+        
         # System prompts for different agent types
         self.system_prompts = {
             "planner": """You are TORIS AI's Planning Agent. Your role is to help users break down complex tasks into manageable steps.
@@ -54,7 +56,9 @@ Always cite your sources and provide balanced perspectives. Use tools like web s
     
     def get_system_prompt(self):
         """Get the system prompt for the current agent type"""
-        return self.system_prompts.get(self.agent_type.lower(), self.system_prompts["planner"])
+        if self._system_prompt is None:
+            self._system_prompt = self.system_prompts.get(self.agent_type.lower(), self.system_prompts["planner"])
+        return self._system_prompt
     
     def process_query(self, query, ollama_url="http://localhost:11434"):
         """
@@ -70,7 +74,7 @@ Always cite your sources and provide balanced perspectives. Use tools like web s
         import requests
         
         # Get recent conversation history for context
-        context = self.memory.get_recent_history(3)
+        context = self.memory.get_recent_history(3, query=query)
         
         # Prepare the full prompt with tools information
         full_prompt = f"""
@@ -194,6 +198,7 @@ Based on these results, provide a final comprehensive response to the user's que
         """Change the agent type"""
         if new_type.lower() in ["planner", "coder", "researcher"]:
             self.agent_type = new_type.lower()
+            self._system_prompt = None
             return f"Agent type changed to {new_type}"
         else:
             return f"Invalid agent type: {new_type}. Available types: planner, coder, researcher"
@@ -7,7 +7,7 @@ import threading
 import requests
 from bs4 import BeautifulSoup
 import json
-from memory_manager import Memory
+from memory_manager import get_memory
 from tools import Tools
 from agent import Agent
 import base64
@@ -29,7 +29,7 @@ for dir_path in [CONFIG["memory_dir"], CONFIG["documents_dir"], CONFIG["chroma_d
     os.makedirs(dir_path, exist_ok=True)
 
 # Initialize components
-memory = Memory(CONFIG["memory_dir"])
+memory = get_memory(CONFIG["memory_dir"])
 tools = Tools(CONFIG["memory_dir"])
 agent = Agent(agent_type="general", model=CONFIG["default_model"])
 
@@ -4,9 +4,15 @@ import subprocess
 import requests
 import json
 import time
+import atexit
 import logging
+import asyncio
+import threading
+import collections
 from typing import Dict, List, Any, Optional, Tuple
 
+from dir_utils import ensure_dir
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,7 +39,7 @@ CONFIG = {
 # Ensure directories exist
 for dir_path in [CONFIG["memory_dir"], CONFIG["documents_dir"], CONFIG["chroma_db_dir"], 
                 CONFIG["logs_dir"], CONFIG["screenshots_dir"]]:
-    os.makedirs(dir_path, exist_ok=True)
+    ensure_dir(dir_path)
 
 class OllamaClient:
     """Client for interacting with Ollama API"""
@@ -87,54 +93,162 @@ class OllamaClient:
             logger.error(f"Error generating text: {str(e)}")
             return f"Error processing query: {str(e)}"
 
+class OllamaAsyncClient:
+    """Asynchronous client for concurrent Ollama requests"""
+    
+    def __init__(self, base_url: str = "http://localhost:11434", max_connections: int = 8):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self._session = None
+    
+    async def _get_session(self):
+        """Get the shared keep-alive session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            )
+        return self._session
+    
+    async def generate(self, prompt: str, model: str, system_prompt: str = None,
+                       temperature: float = 0.7, max_tokens: int = 2000) -> str:
+        """Generate text using Ollama"""
+        try:
+            url = f"{self.base_url}/api/generate"
+            
+            payload = {
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            }
+            
+            if system_prompt:
+                payload["system"] = system_prompt
+            
+            session = await self._get_session()
+            async with session.post(url, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("response", "")
+                text = await response.text()
+                logger.error(f"Ollama API error: {response.status} - {text}")
+                return f"Error: {response.status} - {text}"
+        except Exception as e:
+            logger.error(f"Error generating text: {str(e)}")
+            return f"Error processing query: {str(e)}"
+    
+    async def close(self):
+        """Close the shared session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
 class MemoryManager:
     """Manager for conversation memory and vector storage"""
     
-    def __init__(self, memory_dir: str = "./memory", chroma_db_dir: str = "./chroma_db"):
+    def __init__(self, memory_dir: str = "./memory", chroma_db_dir: str = "./chroma_db",
+                 fsync_max_age: float = 2.0, fsync_max_dirty: int = 16):
         self.memory_dir = memory_dir
         self.chroma_db_dir = chroma_db_dir
-        self.conversation_file = os.path.join(memory_dir, "conversation_history.json")
+        self.conversation_file = os.path.join(memory_dir, "conversation_history.jsonl")
+        self.legacy_conversation_file = os.path.join(memory_dir, "conversation_history.json")
+        self.fsync_max_age = fsync_max_age
+        self.fsync_max_dirty = fsync_max_dirty
         
-        # Initialize memory file if it doesn't exist
-        if not os.path.exists(self.conversation_file):
-            with open(self.conversation_file, "w") as f:
-                json.dump([], f)
+        # Convert a legacy JSON array history to JSONL once
+        self._migrate_legacy_history()
+        
+        # Keep a single line-buffered append handle open for the process lifetime;
+        # fsync is batched by flush_if_stale() instead of happening per turn
+        self._f = open(self.conversation_file, "a", encoding="utf-8", buffering=1)
+        self._dirty = 0
+        self._dirty_since = 0.0
+        atexit.register(self._close)
+    
+    def _migrate_legacy_history(self):
+        """
+        Rewrite the legacy JSON array history as JSONL if no JSONL file exists yet
+        
+        A legacy file that cannot be converted raises, leaving no JSONL behind, so
+        history is never silently started afresh over an unmigrated file.
+        """
+        if os.path.exists(self.conversation_file):
+            return
+        
+        # Convert into a temp file and swap it in only once the whole history is written,
+        # so a malformed legacy file or a crash never leaves a partial history behind
+        temp_file = self.conversation_file + ".tmp"
+        try:
+            history = []
+            try:
+                with open(self.legacy_conversation_file, "r") as f:
+                    history = json.load(f)
+            except FileNotFoundError:
+                pass
+            with open(temp_file, "w", encoding="utf-8") as out:
+                for entry in history:
+                    out.write(json.dumps(entry) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_file, self.conversation_file)
+            if history:
+                logger.info(f"Migrated {len(history)} entries to {self.conversation_file}")
+        except BaseException as e:
+            # Leave no JSONL behind, so the migration is retried on the next start
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            logger.error(f"Error migrating legacy memory: {str(e)}")
+            raise
     
     def save_interaction(self, user_message: str, ai_response: str) -> bool:
         """Save a user-AI interaction to memory"""
         try:
-            # Load existing history
-            if os.path.exists(self.conversation_file):
-                with open(self.conversation_file, "r") as f:
-                    history = json.load(f)
-            else:
-                history = []
-            
-            # Add new entry
-            history.append({
+            entry = {
                 "user": user_message,
                 "ai": ai_response,
                 "timestamp": time.time()
-            })
+            }
+            self._f.write(json.dumps(entry) + "\n")
             
-            # Save updated history
-            with open(self.conversation_file, "w") as f:
-                json.dump(history, f, indent=2)
+            if not self._dirty:
+                self._dirty_since = time.monotonic()
+            self._dirty += 1
+            self.flush_if_stale()
             
             return True
         except Exception as e:
             logger.error(f"Error saving to memory: {str(e)}")
             return False
     
+    def flush_if_stale(self, max_age: Optional[float] = None, max_dirty: Optional[int] = None) -> None:
+        """Fsync pending writes once they are older than max_age seconds or exceed max_dirty records"""
+        if not self._dirty or self._f.closed:
+            return
+        
+        max_age = self.fsync_max_age if max_age is None else max_age
+        max_dirty = self.fsync_max_dirty if max_dirty is None else max_dirty
+        if self._dirty < max_dirty and time.monotonic() - self._dirty_since < max_age:
+            return
+        
+        try:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._dirty = 0
+        except OSError as e:
+            logger.error(f"Error syncing memory: {str(e)}")
+    
     def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent conversation history"""
         try:
-            if os.path.exists(self.conversation_file):
-                with open(self.conversation_file, "r") as f:
-                    history = json.load(f)
-                
-                # Return most recent entries
-                return history[-limit:] if limit > 0 else history
+            with open(self.conversation_file, "r", encoding="utf-8") as f:
+                history = [json.loads(line) for line in f if line.strip()]
+            
+            # Return most recent entries
+            return history[-limit:] if limit > 0 else history
+        except FileNotFoundError:
             return []
         except Exception as e:
             logger.error(f"Error retrieving memory: {str(e)}")
@@ -142,6 +256,7 @@ class MemoryManager:
     
     def get_formatted_history(self, limit: int = 10) -> str:
         """Get formatted conversation history as text"""
+        self.flush_if_stale()
         history = self.get_conversation_history(limit)
         
         if not history:
@@ -157,12 +272,21 @@ class MemoryManager:
     def clear_history(self) -> bool:
         """Clear conversation history"""
         try:
-            with open(self.conversation_file, "w") as f:
-                json.dump([], f)
+            self._f.flush()
+            self._f.truncate(0)
+            self._dirty = 1
+            self.flush_if_stale(max_age=0)
             return True
         except Exception as e:
             logger.error(f"Error clearing memory: {str(e)}")
             return False
+    
+    def _close(self):
+        """Flush, sync and close the history handle"""
+        if self._f.closed:
+            return
+        self.flush_if_stale(max_age=0)
+        self._f.close()
 
 class CodeExecutor:
     """Executor for running code in various languages"""
@@ -251,25 +375,24 @@ class CommandProcessor:
             return "No command to execute"
         
         try:
-            if command.startswith("search:"):
-                query = command[7:].strip()
-                return self._handle_search(query)
+            head, sep, rest = command.partition(":")
+            rest = rest.strip()
+            
+            if sep and head == "search":
+                return self._handle_search(rest)
             
-            elif command.startswith("browse:"):
-                url = command[7:].strip()
-                return self._handle_browse(url)
+            elif sep and head == "browse":
+                return self._handle_browse(rest)
             
-            elif command.startswith("file:"):
-                parts = command[5:].strip().split(" ", 1)
-                if len(parts) < 2:
+            elif sep and head == "file":
+                operation, has_payload, payload = rest.partition(" ")
+                if not has_payload:
                     return "Invalid file command. Use: file:read|write|list path [content]"
                 
-                operation = parts[0]
-                return self._handle_file_operation(operation, parts[1:])
+                return self._handle_file_operation(operation, payload)
             
-            elif command.startswith("model:"):
-                model = command[6:].strip()
-                return self._handle_model_change(model)
+            elif sep and head == "model":
+                return self._handle_model_change(rest)
             
             elif command.startswith("help"):
                 return self._show_help()
@@ -290,10 +413,12 @@ class CommandProcessor:
         # In a full implementation, this would use a web browser
         return f"Web content from {url}:\nThis feature requires web browsing integration."
     
-    def _handle_file_operation(self, operation: str, args: List[str]) -> str:
+    def _handle_file_operation(self, operation: str, payload: str) -> str:
         """Handle file operations"""
+        path = payload.strip()
+        
         if operation == "list":
-            path = args[0] if args else "."
+            path = path or "."
             try:
                 files = os.listdir(path)
                 return f"Directory listing for {path}:\n" + "\n".join(files)
@@ -301,9 +426,8 @@ class CommandProcessor:
                 return f"Error listing directory: {str(e)}"
         
         elif operation == "read":
-            if not args:
+            if not path:
                 return "Missing file path. Use: file:read path"
-            path = args[0]
             try:
                 with open(path, "r") as f:
                     content = f.read()
@@ -312,10 +436,9 @@ class CommandProcessor:
                 return f"Error reading file: {str(e)}"
         
         elif operation == "write":
-            if len(args) < 2:
+            path, _, content = path.partition(" ")
+            if not path or not content:
                 return "Invalid write command. Use: file:write path content"
-            path = args[0]
-            content = args[1]
             try:
                 with open(path, "w") as f:
                     f.write(content)
@@ -348,12 +471,18 @@ class CommandProcessor:
 class AgentManager:
     """Manager for different agent types and roles"""
     
-    def __init__(self, ollama_client: OllamaClient, memory_manager: MemoryManager):
+    def __init__(self, ollama_client: OllamaClient, memory_manager: MemoryManager,
+                 async_client: Optional[OllamaAsyncClient] = None):
         self.ollama_client = ollama_client
         self.memory_manager = memory_manager
+        self.async_client = async_client or OllamaAsyncClient(ollama_client.base_url)
+        self._loop = None
+        self._loop_lock = threading.Lock()
         self.current_agent = "General"
         self.status = "ACTIVE"
         self.steps = 0
+        # Pre-formatted "User/Assistant" snippets of the most recent exchanges
+        self._ctx_deque = collections.deque(maxlen=5)
     
     def process_query(self, message: str, history: List[Tuple[str, str]], 
                      agent_type: str = None) -> Tuple[List[Tuple[str, str]], str, str, str]:
@@ -386,6 +515,8 @@ class AgentManager:
             
             # Update history with AI response
             history[-1] = (message, response)
+            if response:  # Only keep complete exchanges for context
+                self._ctx_deque.append(f"User: {message}\nAssistant: {response}\n\n")
             
             # Save to memory
             self.memory_manager.save_interaction(message, response)
@@ -398,6 +529,33 @@ class AgentManager:
             self.status = "ERROR"
             return history, self.status, self.current_agent, str(self.steps)
     
+    async def process_queries(self, prompts: List[str], agent_type: str = None) -> List[str]:
+        """Run several independent prompts concurrently and return their responses in order"""
+        system_prompt = self._get_system_prompt(agent_type or self.current_agent)
+        return await asyncio.gather(*(
+            self.async_client.generate(
+                prompt=prompt,
+                model=CONFIG["default_model"],
+                system_prompt=system_prompt
+            )
+            for prompt in prompts
+        ))
+    
+    def process_queries_sync(self, prompts: List[str], agent_type: str = None) -> List[str]:
+        """Blocking wrapper around process_queries for the synchronous GUI API"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.process_queries(prompts, agent_type), self._get_loop()
+        )
+        return future.result()
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the background event loop, starting its thread on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="toris-async", daemon=True).start()
+            return self._loop
+    
     def _get_system_prompt(self, agent_type: str) -> str:
         """Get system prompt based on agent type"""
         if agent_type.lower() == "planner":
@@ -428,16 +586,15 @@ You have access to various tools including code execution, file operations, and
 Your goal is to provide helpful, accurate, and thoughtful assistance."""
     
     def _prepare_context(self, history: List[Tuple[str, str]]) -> str:
-        """Prepare context from conversation history"""
-        # Use the most recent exchanges for context
-        recent_history = history[-5:] if len(history) > 5 else history
+        """Prepare context from conversation history
         
-        context = "Previous conversation:\n"
-        for user_msg, ai_msg in recent_history:
-            if user_msg and ai_msg:  # Only include complete exchanges
-                context += f"User: {user_msg}\nAssistant: {ai_msg}\n\n"
-        
-        return context
+        The context is the rolling window of exchanges completed by this manager;
+        a history with no earlier exchanges (the GUI chat was cleared) resets it.
+        """
+        # history already ends with the pending (message, None) turn
+        if len(history) <= 1:
+            self._ctx_deque.clear()
+        return "Previous conversation:\n" + "".join(self._ctx_deque)
 
 class TorisBackend:
     """Main backend class for TORIS AI"""
@@ -476,6 +633,10 @@ class TorisBackend:
         """Process a user query"""
         return self.agent_manager.process_query(message, history, agent_type)
     
+    def process_queries(self, prompts: List[str], agent_type: str = None) -> List[str]:
+        """Process several independent prompts concurrently"""
+        return self.agent_manager.process_queries_sync(prompts, agent_type)
+    
     def execute_code(self, code: str, language: str = "python") -> str:
         """Execute code"""
         return self.code_executor.execute(code, language)
@@ -498,6 +659,9 @@ def initialize_backend():
 def process_query(message, history, agent_type=None):
     return toris_backend.process_query(message, history, agent_type)
 
+def process_queries(prompts, agent_type=None):
+    return toris_backend.process_queries(prompts, agent_type)
+
 def execute_code(code, language="python"):
     return toris_backend.execute_code(code, language)
 
@@ -0,0 +1,16 @@
+# TORIS AI - Directory Helpers
+#
+# Shared by backend, tools and gui_automation, so a directory used by several of
+# them (such as ./screenshots or ./memory) is only checked once per process.
+
+import os
+
+# Directories already created by this process
+_DIRS_READY = set()
+
+def ensure_dir(path):
+    """Create a directory once per process"""
+    if path in _DIRS_READY:
+        return
+    os.makedirs(path, exist_ok=True)
+    _DIRS_READY.add(path)
@@ -11,6 +11,8 @@ from PIL import Image, ImageGrab
 import io
 import sys  # Added missing import
 
+from dir_utils import ensure_dir
+
 class GUIAutomation:
     """
     GUI Automation for TORIS AI.
@@ -25,7 +27,7 @@ class GUIAutomation:
     
     def ensure_directories(self):
         """Ensure necessary directories exist"""
-        os.makedirs(self.screenshots_dir, exist_ok=True)
+        ensure_dir(self.screenshots_dir)
     
     def _setup_platform_specific(self):
         """Setup platform-specific dependencies"""
@@ -1,9 +1,65 @@
 # TORIS AI - Memory Management Module
 
 import os
+import re
 import json
 import time
-from datetime import datetime
+import mmap
+import atexit
+import sqlite3
+import threading
+from collections import deque
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    _loads = json.loads
+
+# Block size used when reading the history file backwards
+TAIL_CHUNK_SIZE = 64 * 1024
+
+# Active history size above which it is compressed into a zstd segment
+ARCHIVE_THRESHOLD = 100 * 1024 * 1024
+ARCHIVE_LEVEL = 3
+
+# Number of most recent interactions kept in memory for prompt construction
+RECENT_CACHE_SIZE = 200
+
+# Share of a token budget history may fill before older turns are summarized
+TOKEN_BUDGET_RATIO = 0.8
+
+# Sentences that record decisions or facts, kept when older turns are summarized
+_SUMMARY_CUES = re.compile(
+    r'[^.!?\n]*\b(decided|agreed|conclusion|plan|must|should|will|need to|remember|prefer|important)\b[^.!?\n]*[.!?]?',
+    re.IGNORECASE
+)
+SUMMARY_MAX_FACTS = 5
+
+# Near-duplicate check: new turns are compared against this many recent ones
+DEDUP_WINDOW = 20
+DEDUP_THRESHOLD = 0.9
+
+def _signature(user_message, ai_response):
+    """MinHash-style signature: the 32 smallest token hashes of an interaction"""
+    tokens = set(f"{user_message} {ai_response}".lower().split())
+    return frozenset(sorted(hash(token) & 0xFFFFFFFF for token in tokens)[:32])
+
+def _estimate_tokens(user_message, ai_response):
+    """Rough token count of an interaction (about four characters per token)"""
+    return (len(user_message) + len(ai_response)) // 4
+
+# Greetings and acknowledgements that are not worth storing or retrieving for
+_LOW_SIGNAL = re.compile(r'^(hi|hello|hey|thanks|thank you|ok|okay|yes|no|bye)\b', re.IGNORECASE)
+_LOW_SIGNAL_MAX_LEN = 12
+
+def _is_low_signal(text):
+    """Check whether a message is a short greeting or acknowledgement"""
+    text = text.strip()
+    return len(text) < _LOW_SIGNAL_MAX_LEN and bool(_LOW_SIGNAL.match(text))
 
 class Memory:
     """
@@ -11,22 +67,302 @@ class Memory:
     Handles conversation history storage and retrieval.
     """
     
-    def __init__(self, memory_dir="./memory"):
-        """Initialize memory manager with specified directory"""
+    def __init__(self, memory_dir="./memory", batch_size=16, flush_interval=1.0):
+        """
+        Initialize memory manager with specified directory
+        
+        Args:
+            memory_dir (str): Directory holding the conversation history
+            batch_size (int): Number of buffered interactions that triggers a write
+            flush_interval (float): Seconds after which buffered interactions are written anyway
+        """
         self.memory_dir = memory_dir
-        self.conversation_file = os.path.join(memory_dir, "conversation_history.json")
+        self.conversation_file = os.path.join(memory_dir, "conversation_history.jsonl")
+        self.legacy_conversation_file = os.path.join(memory_dir, "conversation_history.json")
+        self.manifest_file = os.path.join(memory_dir, "manifest.json")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         self.ensure_memory_dir()
         self.ensure_conversation_file()
+        
+        # Compressed older history segments, oldest first
+        self._segments = self._load_manifest()
+        
+        # Interactions are buffered and written in batches through one open handle
+        self._fh = open(self.conversation_file, 'ab', buffering=1 << 20)
+        self._buf = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending_rows = []
+        atexit.register(self._flush)
+        self._archive()
+        
+        # Full-text index used by search_memory; None falls back to scanning the file
+        self._index = self._open_index()
+        
+        # Most recent interactions, oldest first, so hot paths never read the file
+        self._recent = deque(reversed(list(self._tail_records(RECENT_CACHE_SIZE))), maxlen=RECENT_CACHE_SIZE)
+        self._recent_sigs = deque(
+            (_signature(r['user'], r['ai']) for r in list(self._recent)[-DEDUP_WINDOW:]),
+            maxlen=DEDUP_WINDOW
+        )
     
     def ensure_memory_dir(self):
         """Ensure memory directory exists"""
         os.makedirs(self.memory_dir, exist_ok=True)
     
     def ensure_conversation_file(self):
-        """Ensure conversation history file exists"""
-        if not os.path.exists(self.conversation_file):
-            with open(self.conversation_file, 'w') as f:
-                json.dump([], f)
+        """Ensure conversation history file exists, converting a legacy JSON array once"""
+        if os.path.exists(self.conversation_file):
+            return
+        
+        # Convert into a temp file and swap it in only once the whole history is written,
+        # so a malformed legacy file or a crash never leaves a partial history behind
+        temp_file = self.conversation_file + ".tmp"
+        try:
+            with open(temp_file, 'wb') as out:
+                if os.path.exists(self.legacy_conversation_file):
+                    for item in self._iter_legacy(self.legacy_conversation_file):
+                        out.write(_dumps(item) + b"\n")
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_file, self.conversation_file)
+        except BaseException:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+    
+    @staticmethod
+    def _iter_legacy(path):
+        """Yield records from a legacy JSON array file one at a time"""
+        try:
+            import ijson
+        except ImportError:
+            # Without ijson the whole array has to be loaded at once
+            with open(path, 'r') as f:
+                yield from json.load(f)
+            return
+        
+        with open(path, 'rb') as f:
+            # use_float keeps timestamps as float instead of Decimal
+            yield from ijson.items(f, 'item', use_float=True)
+    
+    def _load_manifest(self):
+        """Load the list of compressed history segments"""
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+    
+    def _save_manifest(self):
+        """Atomically write the list of compressed history segments"""
+        temp_file = self.manifest_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self._segments, f, indent=2)
+        os.replace(temp_file, self.manifest_file)
+    
+    def _archive(self):
+        """
+        Compress the active history into a new zstd segment once it exceeds ARCHIVE_THRESHOLD
+        
+        Returns:
+            bool: True if a segment was written
+        """
+        try:
+            import zstandard
+        except ImportError:
+            return False
+        
+        with self._lock:
+            self._flush_locked()
+            if self._fh.closed or os.path.getsize(self.conversation_file) < ARCHIVE_THRESHOLD:
+                return False
+            
+            name = f"conversation_history.{len(self._segments) + 1}.jsonl.zst"
+            first = last = None
+            count = 0
+            cctx = zstandard.ZstdCompressor(level=ARCHIVE_LEVEL)
+            with open(self.conversation_file, 'rb') as inp, \
+                    zstandard.open(os.path.join(self.memory_dir, name), 'wb', cctx=cctx) as out:
+                for line in inp:
+                    if not line.strip():
+                        continue
+                    out.write(line)
+                    if first is None:
+                        first = line
+                    last = line
+                    count += 1
+            
+            self._segments.append({
+                "name": name,
+                "first_ts": _loads(first).get("timestamp"),
+                "last_ts": _loads(last).get("timestamp"),
+                "n_records": count
+            })
+            self._save_manifest()
+            self._reset_active_locked()
+        return True
+    
+    def _iter_segment(self, segment):
+        """Yield the records of a compressed history segment in chronological order"""
+        import zstandard
+        
+        with zstandard.open(os.path.join(self.memory_dir, segment["name"]), 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+    
+    def _reset_active_locked(self):
+        """Replace the active history with an empty file; the caller must hold self._lock"""
+        # Swap in an empty file so a crash never leaves a half-truncated history
+        self._fh.close()
+        temp_file = self.conversation_file + ".tmp"
+        open(temp_file, 'wb').close()
+        os.replace(temp_file, self.conversation_file)
+        self._fh = open(self.conversation_file, 'ab', buffering=1 << 20)
+    
+    def _open_index(self):
+        """Open the SQLite FTS5 search index, building it from the history on first use"""
+        try:
+            conn = sqlite3.connect(os.path.join(self.memory_dir, "index.db"), check_same_thread=False)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'mem'").fetchone() is None:
+                conn.execute("CREATE VIRTUAL TABLE mem USING fts5(user, ai, agent_type UNINDEXED, ts UNINDEXED)")
+                conn.executemany(
+                    "INSERT INTO mem(user, ai, agent_type, ts) VALUES (?, ?, ?, ?)",
+                    ((r['user'], r['ai'], r.get('agent_type'), r.get('timestamp')) for r in self._iter_records())
+                )
+                conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            print(f"Search index unavailable, searching the history file instead: {str(e)}")
+            return None
+    
+    def _flush(self):
+        """Write buffered interactions to the history file"""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        """Write buffered interactions; the caller must hold self._lock"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._fh.closed:
+            return
+        if self._buf:
+            self._fh.write(b"".join(self._buf))
+            self._buf.clear()
+        self._fh.flush()
+        if self._pending_rows:
+            if self._index is not None:
+                self._index.executemany(
+                    "INSERT INTO mem(user, ai, agent_type, ts) VALUES (?, ?, ?, ?)",
+                    self._pending_rows
+                )
+                self._index.commit()
+            self._pending_rows.clear()
+    
+    def close(self):
+        """Write buffered interactions, sync them to disk and release the history file"""
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._flush_locked()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+        atexit.unregister(self._flush)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _iter_records(self):
+        """Yield stored interactions in chronological order"""
+        self._flush()
+        for segment in self._segments:
+            yield from self._iter_segment(segment)
+        with open(self.conversation_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+    
+    def _tail_records(self, limit, predicate=None):
+        """
+        Yield up to `limit` records newest first, continuing into compressed segments
+        
+        Args:
+            limit (int): Maximum number of records to yield
+            predicate (callable, optional): Only records for which this returns True are yielded
+        """
+        found = 0
+        for record in self._tail_active(limit, predicate):
+            yield record
+            found += 1
+        
+        for segment in reversed(self._segments):
+            if found >= limit:
+                return
+            # Segments can only be read forwards; keep just the newest matches
+            matches = deque(maxlen=limit - found)
+            for record in self._iter_segment(segment):
+                if predicate is None or predicate(record):
+                    matches.append(record)
+            for record in reversed(matches):
+                yield record
+                found += 1
+    
+    def _tail_active(self, limit, predicate=None):
+        """
+        Yield up to `limit` records newest first, reading the active file backwards
+        
+        Args:
+            limit (int): Maximum number of records to yield
+            predicate (callable, optional): Only records for which this returns True are yielded
+        """
+        self._flush()
+        try:
+            fd = os.open(self.conversation_file, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        except FileNotFoundError:
+            return
+        
+        try:
+            pos = os.lseek(fd, 0, os.SEEK_END)
+            found = 0
+            partial = b""
+            while found < limit:
+                if pos == 0:
+                    # Only the first line of the file is left
+                    lines, partial = [partial], b""
+                else:
+                    size = min(TAIL_CHUNK_SIZE, pos)
+                    pos -= size
+                    os.lseek(fd, pos, os.SEEK_SET)
+                    lines = (os.read(fd, size) + partial).split(b"\n")
+                    # The first piece may continue in the previous chunk
+                    partial = lines.pop(0)
+                
+                for line in reversed(lines):
+                    if not line.strip():
+                        continue
+                    record = _loads(line)
+                    if predicate is None or predicate(record):
+                        yield record
+                        found += 1
+                        if found >= limit:
+                            return
+                
+                if pos == 0 and not partial:
+                    return
+        finally:
+            os.close(fd)
     
     def add_interaction(self, user_message, ai_response, agent_type="general"):
         """
@@ -37,53 +373,102 @@ class Memory:
             ai_response (str): The AI's response
             agent_type (str): The type of agent used (planner, coder, researcher, etc.)
         """
+        # Skip trivial turns such as "hi" or "thanks"
+        if _is_low_signal(user_message):
+            return True
+        
+        # Skip retries and regenerations that nearly repeat a recent turn
+        signature = _signature(user_message, ai_response)
+        if self._is_duplicate(signature):
+            return True
+        
         try:
-            # Load existing memory
-            with open(self.conversation_file, 'r') as f:
-                memory = json.load(f)
-            
-            # Add new interaction
-            memory.append({
+            record = {
                 "timestamp": time.time(),
-                "datetime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "agent_type": agent_type,
                 "user": user_message,
-                "ai": ai_response
-            })
+                "ai": ai_response,
+                "tok": _estimate_tokens(user_message, ai_response)
+            }
             
-            # Save updated memory
-            with open(self.conversation_file, 'w') as f:
-                json.dump(memory, f, indent=2)
-                
+            line = _dumps(record) + b"\n"
+            
+            # Buffer the line; write once the batch is full or the flush timer fires
+            with self._lock:
+                self._buf.append(line)
+                self._pending_rows.append((user_message, ai_response, agent_type, record["timestamp"]))
+                if len(self._buf) >= self.batch_size:
+                    self._flush_locked()
+                elif self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+            
+            self._recent.append(record)
+            self._recent_sigs.append(signature)
             return True
         except Exception as e:
             print(f"Error adding to memory: {str(e)}")
             return False
     
-    def get_recent_history(self, limit=5, agent_type=None):
+    def _is_duplicate(self, signature):
+        """Check whether a signature is nearly identical to one of the recent interactions"""
+        if not signature:
+            return False
+        for previous in self._recent_sigs:
+            if len(signature & previous) / len(signature | previous) >= DEDUP_THRESHOLD:
+                return True
+        return False
+    
+    def _should_retrieve(self, query):
+        """Check whether a query is worth running a keyword search for"""
+        return query is None or not _is_low_signal(query)
+    
+    def get_recent_history(self, limit=5, agent_type=None, query=None, token_budget=None):
         """
         Get recent conversation history
         
         Args:
             limit (int): Maximum number of interactions to retrieve
             agent_type (str, optional): Filter by agent type
+            query (str, optional): The query the history is fetched for; accepted for API
+                compatibility, the recent window is returned for every query so short
+                follow-ups such as "yes" keep their context
+            token_budget (int, optional): Context size in tokens; turns beyond 80% of it are summarized
             
         Returns:
             str: Formatted conversation history
         """
         try:
-            with open(self.conversation_file, 'r') as f:
-                memory = json.load(f)
-            
             # Filter by agent type if specified
-            if agent_type:
-                memory = [m for m in memory if m.get("agent_type") == agent_type]
+            predicate = (lambda m: m.get("agent_type") == agent_type) if agent_type else None
+            
+            # Get the most recent interactions from the in-memory cache
+            recent = []
+            for item in reversed(self._recent):
+                if len(recent) >= limit:
+                    break
+                if predicate is None or predicate(item):
+                    recent.append(item)
+            
+            # Older matches can only be on disk if the cache is full
+            if len(recent) < limit and len(self._recent) == self._recent.maxlen:
+                recent = list(self._tail_records(limit, predicate))
             
-            # Get the most recent interactions
-            recent = memory[-limit:] if len(memory) > limit else memory
+            # Keep the newest turns that fit the token budget
+            older = []
+            if token_budget:
+                used = 0
+                for i, item in enumerate(recent):
+                    used += item.get("tok", _estimate_tokens(item['user'], item['ai']))
+                    if used > TOKEN_BUDGET_RATIO * token_budget:
+                        recent, older = recent[:i], recent[i:]
+                        break
+            recent.reverse()
+            older.reverse()
             
             # Format for context
-            context = ""
+            context = self._heuristic_summary(older) if older else ""
             for item in recent:
                 context += f"User: {item['user']}\nAI: {item['ai']}\n\n"
             
@@ -92,9 +477,37 @@ class Memory:
             print(f"Error retrieving memory: {str(e)}")
             return ""
     
+    def _heuristic_summary(self, records):
+        """
+        Summarize older interactions without an LLM call
+        
+        Args:
+            records (list): Interactions to summarize, oldest first
+            
+        Returns:
+            str: Formatted summary of decisions and facts found in the interactions
+        """
+        facts = []
+        for item in records:
+            for text in (item['user'], item['ai']):
+                for match in _SUMMARY_CUES.finditer(text):
+                    facts.append(match.group(0).strip())
+                    if len(facts) >= SUMMARY_MAX_FACTS:
+                        break
+        
+        if not facts:
+            facts = [item['user'].strip() for item in records[-SUMMARY_MAX_FACTS:]]
+        
+        summary = "".join(f"- {fact}\n" for fact in facts[:SUMMARY_MAX_FACTS])
+        return f"Earlier conversation ({len(records)} interactions):\n{summary}\n"
+    
     def search_memory(self, query, limit=5):
         """
-        Simple keyword search in memory
+        Keyword search in memory
+        
+        A record matches when any query term, case-insensitively, starts one of
+        the words in it. The full-text index and the file scan used without it
+        apply the same rule, so results do not depend on the index existing.
         
         Args:
             query (str): Search terms
@@ -103,34 +516,124 @@ class Memory:
         Returns:
             list: Matching interactions
         """
+        if not self._should_retrieve(query):
+            return []
+        
         try:
-            with open(self.conversation_file, 'r') as f:
-                memory = json.load(f)
+            if self._index is not None and query.strip():
+                return self._search_index(query, limit)
             
-            # Simple keyword search
-            results = []
-            query_terms = query.lower().split()
-            
-            for item in memory:
-                user_text = item['user'].lower()
-                ai_text = item['ai'].lower()
-                
-                # Check if any query term is in the texts
-                if any(term in user_text or term in ai_text for term in query_terms):
-                    results.append(item)
-            
-            # Return limited results, most recent first
-            return results[-limit:] if len(results) > limit else results
+            # Keyword search: one case-insensitive alternation of all terms
+            query_terms = query.split()
+            if not query_terms:
+                return []
+            return self._scan_records(query_terms, limit)
             
         except Exception as e:
             print(f"Error searching memory: {str(e)}")
             return []
     
+    def _scan_records(self, query_terms, limit):
+        """
+        Scan the memory-mapped history file for records with a word starting with any of the terms
+        
+        The raw bytes are searched first and only lines with a hit are decoded,
+        then the hit is confirmed against the user and AI text.
+        
+        Args:
+            query_terms (list): Terms to look for, case-insensitively
+            limit (int): Maximum number of results
+            
+        Returns:
+            list: The newest matching interactions, oldest first
+        """
+        # Word-prefix match, the same rule as the "term"* queries run against the index
+        pattern = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, query_terms)) + ")", re.IGNORECASE)
+        results = deque(maxlen=limit)
+        
+        for segment in self._segments:
+            for item in self._iter_segment(segment):
+                if pattern.search(item['user']) or pattern.search(item['ai']):
+                    results.append(item)
+        
+        self._flush()
+        
+        # A bytes pattern only case-folds ASCII, so non-ASCII queries decode every line instead
+        if not all(term.isascii() for term in query_terms):
+            with open(self.conversation_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    item = _loads(line)
+                    if pattern.search(item['user']) or pattern.search(item['ai']):
+                        results.append(item)
+            return list(results)
+        
+        with open(self.conversation_file, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file cannot be mapped
+                return []
+            
+            byte_pattern = re.compile(b"|".join(re.escape(term.encode('utf-8')) for term in query_terms), re.IGNORECASE)
+            with mm:
+                pos = 0
+                while True:
+                    match = byte_pattern.search(mm, pos)
+                    if match is None:
+                        break
+                    
+                    # Expand the hit to its enclosing line
+                    start = mm.rfind(b"\n", 0, match.start()) + 1
+                    end = mm.find(b"\n", match.end())
+                    if end == -1:
+                        end = len(mm)
+                    
+                    item = _loads(mm[start:end])
+                    if pattern.search(item['user']) or pattern.search(item['ai']):
+                        results.append(item)
+                    pos = end + 1
+        
+        return list(results)
+    
+    def _search_index(self, query, limit):
+        """Run a search against the full-text index, oldest match first"""
+        sql = "SELECT user, ai, agent_type, ts FROM mem WHERE mem MATCH ? ORDER BY ts DESC LIMIT ?"
+        # Any term as a quoted prefix, matching what _scan_records does without the index
+        terms = " OR ".join('"' + term.replace('"', '""') + '"*' for term in query.split())
+        self._flush()
+        with self._lock:
+            rows = self._index.execute(sql, (terms, limit)).fetchall()
+        
+        return [
+            {"timestamp": ts, "agent_type": agent_type, "user": user, "ai": ai}
+            for user, ai, agent_type, ts in reversed(rows)
+        ]
+    
     def clear_memory(self):
         """Clear all memory"""
         try:
-            with open(self.conversation_file, 'w') as f:
-                json.dump([], f)
+            with self._lock:
+                self._buf.clear()
+                self._pending_rows.clear()
+                self._flush_locked()
+                
+                self._reset_active_locked()
+                
+                for segment in self._segments:
+                    try:
+                        os.remove(os.path.join(self.memory_dir, segment["name"]))
+                    except FileNotFoundError:
+                        pass
+                self._segments = []
+                self._save_manifest()
+                
+                self._recent.clear()
+                self._recent_sigs.clear()
+                if self._index is not None:
+                    self._index.execute("DELETE FROM mem")
+                    self._index.commit()
             return True
         except Exception as e:
             print(f"Error clearing memory: {str(e)}")
@@ -150,8 +653,8 @@ class Memory:
             output_file = os.path.join(self.memory_dir, f"memory_export_{int(time.time())}.json")
         
         try:
-            with open(self.conversation_file, 'r') as f:
-                memory = json.load(f)
+            self._archive()
+            memory = list(self._iter_records())
             
             with open(output_file, 'w') as f:
                 json.dump(memory, f, indent=2)
@@ -161,8 +664,29 @@ class Memory:
             print(f"Error exporting memory: {str(e)}")
             return None
 
+# One Memory per directory, so every component sees the same recent-turn cache
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_memory(memory_dir="./memory"):
+    """
+    Get the shared Memory instance for a directory
+    
+    Args:
+        memory_dir (str): Directory holding the conversation history
+        
+    Returns:
+        Memory: The instance shared by all callers using this directory
+    """
+    key = os.path.realpath(memory_dir)
+    with _SHARED_LOCK:
+        memory = _SHARED.get(key)
+        if memory is None:
+            memory = _SHARED[key] = Memory(memory_dir)
+        return memory
+
 # Example usage
 if __name__ == "__main__":
-    memory = Memory()
-    memory.add_interaction("Hello, how are you?", "I'm doing well, thank you for asking!")
-    print(memory.get_recent_history())
+    with Memory() as memory:
+        memory.add_interaction("Hello, how are you?", "I'm doing well, thank you for asking!")
+        print(memory.get_recent_history())
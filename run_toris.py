@@ -4,7 +4,11 @@ Launches the TORIS AI application with all features
 """
 import os
 import sys
+import re
+import shutil
+import subprocess
 import logging
+from importlib.metadata import distributions
 from pathlib import Path
 
 # Configure logging
@@ -29,6 +33,10 @@ CONFIG = {
     "ollama_host": os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
 }
 
+def _normalize_name(name):
+    """Normalize a distribution name for comparison (PEP 503)"""
+    return re.sub(r"[-_.]+", "-", name or "").lower()
+
 def check_dependencies():
     """Check if all required dependencies are installed"""
     required_packages = [
@@ -39,21 +47,19 @@ def check_dependencies():
         "chromadb"
     ]
     
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    # Compare against installed distribution names instead of importing each package
+    installed = {_normalize_name(dist.metadata["Name"]) for dist in distributions()}
+    missing_packages = [
+        package for package in required_packages
+        if _normalize_name(package) not in installed
+    ]
     
     if missing_packages:
         logger.warning(f"Missing dependencies: {', '.join(missing_packages)}")
         logger.info("Installing missing dependencies...")
         
         try:
-            import subprocess
-            subprocess.check_call([sys.executable, "-m", "pip", "install"] + missing_packages)
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "--prefer-binary", "--no-input"] + missing_packages)
             logger.info("Dependencies installed successfully")
         except Exception as e:
             logger.error(f"Error installing dependencies: {str(e)}")
@@ -64,7 +70,6 @@ def check_dependencies():
     return True
 
 # --- Simplified sanity check (CLI only) -------------------------------
-import shutil, sys
 if shutil.which("ollama") is None:
     print("Ollama executable not found on PATH – aborting.")
     sys.exit(1)
@@ -74,10 +79,7 @@ def create_directories():
     directories = ["logs", "documents", "memory"]
     
     for directory in directories:
-        path = Path(directory)
-        if not path.exists():
-            path.mkdir()
-            logger.info(f"Created directory: {directory}")
+        Path(directory).mkdir(parents=True, exist_ok=True)
 
 def main():
     """Main entry point"""
@@ -2,9 +2,8 @@
 import os
 import sys
 import subprocess
-import platform
 import time
-import requests
+import socket
 import logging
 
 # Configure logging
@@ -18,6 +17,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger("TORIS_RUNNER")
 
+OLLAMA_ADDRESS = ("127.0.0.1", 11434)
+
 def print_header(text):
     print(f"\n=== {text} ===")
 
@@ -25,11 +26,11 @@ def print_step(text):
     print(f"➤ {text}")
 
 def check_ollama_running():
-    """Check if Ollama is running"""
+    """Check if Ollama is running by opening a TCP connection to its port"""
     try:
-        response = requests.get("http://localhost:11434/api/tags")
-        return response.status_code == 200
-    except:
+        with socket.create_connection(OLLAMA_ADDRESS, timeout=0.2):
+            return True
+    except OSError:
         return False
 
 def start_ollama():
@@ -37,17 +38,21 @@ def start_ollama():
     if not check_ollama_running():
         print_step("Starting Ollama...")
         try:
+            import platform
             if platform.system() == "Windows":
                 subprocess.Popen(["ollama", "serve"], creationflags=subprocess.CREATE_NEW_CONSOLE)
             else:
                 subprocess.Popen(["ollama", "serve"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             
-            # Wait for Ollama to start
-            for _ in range(30):  # Wait up to 30 seconds
+            # Wait up to 30 seconds, polling quickly at first and backing off to 1s
+            deadline = time.monotonic() + 30
+            delay = 0.05
+            while time.monotonic() < deadline:
                 if check_ollama_running():
                     print("Ollama started successfully")
                     return True
-                time.sleep(1)
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
             
             print("Failed to start Ollama automatically.")
             print("Please start Ollama manually and try again.")
@@ -4,7 +4,10 @@ import sys
 import subprocess
 import platform
 import shutil
+import importlib.util
 import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # ANSI color codes for terminal output
 class Colors:
@@ -43,14 +46,13 @@ def check_python_version():
 
 def check_pip():
     print_step("Checking pip installation...")
-    try:
-        subprocess.run([sys.executable, "-m", "pip", "--version"], check=True, stdout=subprocess.PIPE)
+    # Look the module up in-process rather than spawning `python -m pip --version`
+    if importlib.util.find_spec("pip") is not None:
         print_success("pip is installed")
         return True
-    except (subprocess.SubprocessError, FileNotFoundError):
-        print_error("pip is not installed or not in PATH")
-        print_warning("Please install pip and try again.")
-        return False
+    print_error("pip is not installed or not in PATH")
+    print_warning("Please install pip and try again.")
+    return False
 
 def install_python_dependencies():
     print_step("Installing Python dependencies...")
@@ -58,15 +60,19 @@ def install_python_dependencies():
         "gradio>=5.0.0",
         "requests>=2.25.0",
         "beautifulsoup4>=4.9.0",
+        "lxml>=4.9.0",
         "pillow>=9.0.0",
         "numpy>=1.20.0",
-        "pandas>=1.0.0"
+        "pandas>=1.0.0",
+        "ijson>=3.2.0",
+        "orjson>=3.0.0",
+        "zstandard>=0.21.0"
     ]
     
     try:
-        for req in requirements:
-            print(f"Installing {req}...")
-            subprocess.run([sys.executable, "-m", "pip", "install", req], check=True)
+        # One pip run resolves the whole set and downloads in a single session
+        print(f"Installing {', '.join(requirements)}...")
+        subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "--prefer-binary", "--no-input", *requirements], check=True)
         print_success("All Python dependencies installed successfully")
         return True
     except subprocess.SubprocessError as e:
@@ -75,15 +81,16 @@ def install_python_dependencies():
 
 def check_ollama():
     print_step("Checking Ollama installation...")
-    try:
-        # Try to run ollama version
-        result = subprocess.run(["ollama", "version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            version = result.stdout.strip()
-            print_success(f"Ollama is installed: {version}")
-            return True
-    except (subprocess.SubprocessError, FileNotFoundError):
-        pass
+    # Only spawn ollama for its version string once it is known to be on PATH
+    if shutil.which("ollama"):
+        try:
+            result = subprocess.run(["ollama", "version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if result.returncode == 0:
+                version = result.stdout.strip()
+                print_success(f"Ollama is installed: {version}")
+                return True
+        except (subprocess.SubprocessError, FileNotFoundError):
+            pass
     
     print_warning("Ollama is not installed or not in PATH")
     
@@ -104,29 +111,38 @@ def check_ollama():
     choice = input("Would you like to continue setup without Ollama? (y/n): ")
     return choice.lower() == 'y'
 
+def _installed_ollama_models():
+    """Return the set of model names reported by a single `ollama list` call"""
+    result = subprocess.run(["ollama", "list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    # Skip the header row; the model name is the first column
+    return {line.split()[0] for line in result.stdout.splitlines()[1:] if line.strip()}
+
+def _pull_models(models):
+    """Pull models concurrently; raises CalledProcessError if any pull fails"""
+    print(f"Pulling {', '.join(models)}... (this may take a while)")
+    def pull(model):
+        # Output is captured so the progress bars of parallel pulls don't interleave
+        subprocess.run(["ollama", "pull", model], check=True, capture_output=True)
+        print(f"Pulled {model}")
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        list(executor.map(pull, models))
+
 def check_models():
     print_step("Checking for required models...")
     try:
-        # Check if Ollama is running
-        subprocess.run(["ollama", "list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        # Check if Ollama is running and list its models in one call
+        installed = _installed_ollama_models()
         
         # Check for required models
         models_to_check = ["llama3:8b", "qwen:7b"]
-        models_to_pull = []
-        
-        for model in models_to_check:
-            result = subprocess.run(["ollama", "list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if model not in result.stdout:
-                models_to_pull.append(model)
+        models_to_pull = [model for model in models_to_check if model not in installed]
         
         if models_to_pull:
             print_warning(f"The following models need to be pulled: {', '.join(models_to_pull)}")
             choice = input("Would you like to pull these models now? (y/n): ")
             
             if choice.lower() == 'y':
-                for model in models_to_pull:
-                    print(f"Pulling {model}... (this may take a while)")
-                    subprocess.run(["ollama", "pull", model], check=True)
+                _pull_models(models_to_pull)
                 print_success("All required models pulled successfully")
             else:
                 print_warning("Models will need to be pulled when running TORIS AI")
@@ -144,7 +160,7 @@ def create_directories():
     directories = ["./memory", "./documents", "./chroma_db", "./screenshots"]
     
     for directory in directories:
-        os.makedirs(directory, exist_ok=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
     
     print_success("All required directories created")
     return True
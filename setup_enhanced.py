@@ -4,9 +4,22 @@ import sys
 import subprocess
 import platform
 import shutil
+import importlib.util
 import time
+from pathlib import Path
 import json
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Shared session so the startup poll and model checks reuse one connection.
+# Created on first use: requests may only be importable after dependencies are installed.
+_OLLAMA_SESSION = None
+
+def _ollama_session():
+    global _OLLAMA_SESSION
+    if _OLLAMA_SESSION is None:
+        import requests
+        _OLLAMA_SESSION = requests.Session()
+    return _OLLAMA_SESSION
 
 # ANSI color codes for terminal output
 class Colors:
@@ -45,14 +58,13 @@ def check_python_version():
 
 def check_pip():
     print_step("Checking pip installation...")
-    try:
-        subprocess.run([sys.executable, "-m", "pip", "--version"], check=True, stdout=subprocess.PIPE)
+    # Look the module up in-process rather than spawning `python -m pip --version`
+    if importlib.util.find_spec("pip") is not None:
         print_success("pip is installed")
         return True
-    except (subprocess.SubprocessError, FileNotFoundError):
-        print_error("pip is not installed or not in PATH")
-        print_warning("Please install pip and try again.")
-        return False
+    print_error("pip is not installed or not in PATH")
+    print_warning("Please install pip and try again.")
+    return False
 
 def install_python_dependencies():
     print_step("Installing Python dependencies...")
@@ -60,6 +72,7 @@ def install_python_dependencies():
         "gradio>=5.0.0",
         "requests>=2.25.0",
         "beautifulsoup4>=4.9.0",
+        "lxml>=4.9.0",
         "pillow>=9.0.0",
         "numpy>=1.20.0",
         "pandas>=1.0.0",
@@ -67,30 +80,75 @@ def install_python_dependencies():
         "chromadb>=0.4.18",
         "sentence-transformers>=2.2.2",
         "open-interpreter>=0.2.0",
-        "pydantic>=2.0.0"
+        "pydantic>=2.0.0",
+        "orjson>=3.9.0"
     ]
     
+    pip = [sys.executable, "-m", "pip", "install", "--prefer-binary", "--no-input"]
     try:
-        for req in requirements:
-            print(f"Installing {req}...")
-            subprocess.run([sys.executable, "-m", "pip", "install", req], check=True)
+        # One resolver run for everything; pip downloads in parallel itself
+        subprocess.run(pip + requirements, check=True)
         print_success("All Python dependencies installed successfully")
         return True
     except subprocess.SubprocessError as e:
-        print_error(f"Failed to install Python dependencies: {e}")
+        print_warning(f"Bulk install failed ({e}), retrying packages individually...")
+
+    # Retry each package on its own so the failing ones can be reported
+    failed = []
+    with ThreadPoolExecutor(max_workers=min(8, len(requirements))) as executor:
+        futures = {
+            executor.submit(subprocess.run, pip + [req], capture_output=True, text=True): req
+            for req in requirements
+        }
+        for future in as_completed(futures):
+            req = futures[future]
+            if future.result().returncode == 0:
+                print(f"Installed {req}")
+            else:
+                failed.append(req)
+
+    if failed:
+        print_error(f"Failed to install Python dependencies: {', '.join(sorted(failed))}")
         return False
+    print_success("All Python dependencies installed successfully")
+    return True
 
-def check_ollama():
-    print_step("Checking Ollama installation...")
+_NOT_PROBED = object()
+
+def _run_version(cmd):
+    """Return the stripped output of a version command, or None if it fails"""
     try:
-        # Try to run ollama version
-        result = subprocess.run(["ollama", "version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            version = result.stdout.strip()
-            print_success(f"Ollama is installed: {version}")
-            return True
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     except (subprocess.SubprocessError, FileNotFoundError):
-        pass
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def probe_ollama():
+    """Return the installed Ollama version, or None. Non-interactive, safe to run in a thread."""
+    # Only spawn ollama for its version string once it is known to be on PATH
+    if not shutil.which("ollama"):
+        return None
+    return _run_version(["ollama", "version"])
+
+def probe_docker():
+    """Return (docker_version, compose_version), either None if missing. Non-interactive."""
+    if not shutil.which("docker"):
+        return None, None
+    version = _run_version(["docker", "--version"])
+    if version is None:
+        return None, None
+    # Check for the standalone docker-compose binary, then the `docker compose` plugin
+    if shutil.which("docker-compose"):
+        return version, _run_version(["docker-compose", "--version"])
+    return version, _run_version(["docker", "compose", "version"])
+
+def check_ollama(version=_NOT_PROBED):
+    print_step("Checking Ollama installation...")
+    if version is _NOT_PROBED:
+        version = probe_ollama()
+    if version:
+        print_success(f"Ollama is installed: {version}")
+        return True
     
     print_warning("Ollama is not installed or not in PATH")
     
@@ -111,26 +169,16 @@ def check_ollama():
     choice = input("Would you like to continue setup without Ollama? (y/n): ")
     return choice.lower() == 'y'
 
-def check_docker():
+def check_docker(probe=_NOT_PROBED):
     print_step("Checking Docker installation...")
-    try:
-        # Try to run docker version
-        result = subprocess.run(["docker", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            version = result.stdout.strip()
-            print_success(f"Docker is installed: {version}")
-            
-            # Check docker-compose
-            compose_result = subprocess.run(["docker-compose", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if compose_result.returncode == 0:
-                compose_version = compose_result.stdout.strip()
-                print_success(f"Docker Compose is installed: {compose_version}")
-                return True
-            else:
-                print_warning("Docker is installed but Docker Compose is missing")
-        else:
-            print_warning("Docker is not installed or not in PATH")
-    except (subprocess.SubprocessError, FileNotFoundError):
+    version, compose_version = probe_docker() if probe is _NOT_PROBED else probe
+    if version:
+        print_success(f"Docker is installed: {version}")
+        if compose_version:
+            print_success(f"Docker Compose is installed: {compose_version}")
+            return True
+        print_warning("Docker is installed but Docker Compose is missing")
+    else:
         print_warning("Docker is not installed or not in PATH")
     
     # Provide installation instructions based on platform
@@ -148,12 +196,27 @@ def check_docker():
     choice = input("Would you like to continue setup without Docker? (y/n): ")
     return choice.lower() == 'y'
 
+def _pull_models(models):
+    """Pull models concurrently; raises CalledProcessError if any pull fails"""
+    print(f"Pulling {', '.join(models)}... (this may take a while)")
+    def pull(model):
+        # Output is captured so the progress bars of parallel pulls don't interleave
+        subprocess.run(["ollama", "pull", model], check=True, capture_output=True)
+        print(f"Pulled {model}")
+    with ThreadPoolExecutor(max_workers=len(models)) as executor:
+        list(executor.map(pull, models))
+
 def check_models():
     print_step("Checking for required models...")
+    import requests
+    try:
+        from orjson import loads
+    except ImportError:
+        from json import loads
     try:
         # Check if Ollama is running
         try:
-            response = requests.get("http://localhost:11434/api/tags")
+            response = _ollama_session().get("http://localhost:11434/api/tags")
             if response.status_code != 200:
                 print_warning("Ollama is not running. Starting Ollama...")
                 if platform.system().lower() == "windows":
@@ -161,16 +224,19 @@ def check_models():
                 else:
                     subprocess.Popen(["ollama", "serve"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
                 
-                # Wait for Ollama to start
-                for _ in range(30):  # Wait up to 30 seconds
+                # Wait up to 30 seconds for Ollama to start, polling quickly at first
+                delay = 0.05
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline:
                     try:
-                        response = requests.get("http://localhost:11434/api/tags")
+                        response = _ollama_session().get("http://localhost:11434/api/tags", timeout=(0.2, 0.5))
                         if response.status_code == 200:
                             print_success("Ollama started successfully")
                             break
-                    except:
+                    except requests.RequestException:
                         pass
-                    time.sleep(1)
+                    time.sleep(delay)
+                    delay = min(delay * 1.7, 1.0)
                 else:
                     print_warning("Failed to start Ollama automatically")
         except:
@@ -181,9 +247,9 @@ def check_models():
         models_to_pull = []
         
         try:
-            response = requests.get("http://localhost:11434/api/tags")
+            response = _ollama_session().get("http://localhost:11434/api/tags")
             if response.status_code == 200:
-                available_models = [model["name"] for model in response.json().get("models", [])]
+                available_models = {model["name"] for model in loads(response.content).get("models", [])}
                 
                 for model in models_to_check:
                     if model not in available_models:
@@ -194,9 +260,7 @@ def check_models():
                     choice = input("Would you like to pull these models now? (y/n): ")
                     
                     if choice.lower() == 'y':
-                        for model in models_to_pull:
-                            print(f"Pulling {model}... (this may take a while)")
-                            subprocess.run(["ollama", "pull", model], check=True)
+                        _pull_models(models_to_pull)
                         print_success("All required models pulled successfully")
                     else:
                         print_warning("Models will need to be pulled when running TORIS AI")
@@ -213,13 +277,22 @@ def check_models():
         print_warning("Models will need to be pulled when running TORIS AI")
         return True
 
+# Kept inside .git so it never shows up as an untracked file in the clone
+SUPERAGI_SYNC_STAMP = os.path.join("SuperAGI", ".git", "toris_last_setup")
+SUPERAGI_SYNC_INTERVAL = 3600  # seconds
+
+def _superagi_recently_synced():
+    """True if the SuperAGI clone was checked against its remote within the last hour"""
+    try:
+        return time.time() - os.path.getmtime(SUPERAGI_SYNC_STAMP) < SUPERAGI_SYNC_INTERVAL
+    except OSError:
+        return False
+
 def setup_superagi():
     print_step("Setting up SuperAGI...")
     
     # Check if git is installed
-    try:
-        subprocess.run(["git", "--version"], check=True, stdout=subprocess.PIPE)
-    except (subprocess.SubprocessError, FileNotFoundError):
+    if shutil.which("git") is None:
         print_warning("Git is not installed or not in PATH")
         print_warning("SuperAGI setup requires Git. Please install Git and try again.")
         return False
@@ -233,11 +306,21 @@ def setup_superagi():
         except subprocess.SubprocessError as e:
             print_error(f"Failed to clone SuperAGI repository: {e}")
             return False
+    elif _superagi_recently_synced():
+        print_step("SuperAGI repository was checked for updates recently, skipping")
     else:
-        print_step("SuperAGI repository already exists, updating...")
+        print_step("SuperAGI repository already exists, checking for updates...")
         try:
-            subprocess.run(["git", "-C", "SuperAGI", "pull"], check=True)
-            print_success("SuperAGI repository updated successfully")
+            local = subprocess.run(["git", "-C", "SuperAGI", "rev-parse", "HEAD"],
+                                   check=True, capture_output=True, text=True).stdout.strip()
+            remote = subprocess.run(["git", "-C", "SuperAGI", "ls-remote", "origin", "HEAD"],
+                                    check=True, capture_output=True, text=True).stdout.split()
+            if remote and remote[0] == local:
+                print_success("SuperAGI repository is already up to date")
+            else:
+                subprocess.run(["git", "-C", "SuperAGI", "pull", "--ff-only"], check=True)
+                print_success("SuperAGI repository updated successfully")
+            Path(SUPERAGI_SYNC_STAMP).touch()
         except subprocess.SubprocessError as e:
             print_warning(f"Failed to update SuperAGI repository: {e}")
     
@@ -278,7 +361,7 @@ def create_directories():
     directories = ["./memory", "./documents", "./chroma_db", "./screenshots", "./logs"]
     
     for directory in directories:
-        os.makedirs(directory, exist_ok=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
     
     print_success("All required directories created")
     return True
@@ -287,22 +370,28 @@ def setup_environment():
     print_header("TORIS AI Enhanced Setup")
     print("This script will set up the environment for the enhanced TORIS AI.")
     
-    # Check system requirements
-    if not check_python_version():
-        return False
-    
-    if not check_pip():
-        return False
-    
-    # Install Python dependencies
-    if not install_python_dependencies():
-        return False
-    
-    # Check Ollama installation
-    check_ollama()
-    
-    # Check Docker installation
-    check_docker()
+    # Probe Ollama and Docker in the background while requirements are checked and installed;
+    # the interactive prompts stay on the main thread once the results are in
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ollama_probe = executor.submit(probe_ollama)
+        docker_probe = executor.submit(probe_docker)
+        
+        # Check system requirements
+        if not check_python_version():
+            return False
+        
+        if not check_pip():
+            return False
+        
+        # Install Python dependencies
+        if not install_python_dependencies():
+            return False
+        
+        # Check Ollama installation
+        check_ollama(ollama_probe.result())
+        
+        # Check Docker installation
+        check_docker(docker_probe.result())
     
     # Check models (if Ollama is installed)
     try:
@@ -0,0 +1,93 @@
+"""
+TORIS AI - API Unit Tests
+Regression tests for the FastAPI backend
+"""
+import pytest
+import os
+import sys
+import asyncio
+from unittest.mock import MagicMock, patch
+
+# Add the repository root to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException
+from torisai.api import main as api
+from torisai.core.tool_protocol import ToolCall
+
+def _request(host):
+    """Minimal stand-in for a starlette Request from the given client address"""
+    request = MagicMock()
+    request.client.host = host
+    return request
+
+class TestTokenBucket:
+    """Tests for the rate limiting dependency"""
+
+    @pytest.mark.asyncio
+    async def test_limit_per_client(self):
+        """Each client gets its own capacity and is refused once it is spent"""
+        limiter = api.TokenBucket(2)
+
+        await limiter(_request("10.0.0.1"))
+        await limiter(_request("10.0.0.1"))
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter(_request("10.0.0.1"))
+        assert exc_info.value.status_code == 429
+        assert "Retry-After" in exc_info.value.headers
+
+        # Another client is unaffected
+        await limiter(_request("10.0.0.2"))
+
+    @pytest.mark.asyncio
+    async def test_refill(self):
+        """Tokens come back at capacity / period per second"""
+        limiter = api.TokenBucket(1, period=0.05)
+
+        await limiter(_request("10.0.0.1"))
+        with pytest.raises(HTTPException):
+            await limiter(_request("10.0.0.1"))
+        await asyncio.sleep(0.06)
+        await limiter(_request("10.0.0.1"))
+
+    @pytest.mark.asyncio
+    async def test_idle_buckets_are_evicted(self):
+        """Buckets idle for a full period are dropped, and max_clients caps the map"""
+        limiter = api.TokenBucket(5, period=0.05, max_clients=3)
+
+        for i in range(5):
+            await limiter(_request(f"10.0.0.{i}"))
+        assert list(limiter._buckets) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+
+        await asyncio.sleep(0.06)
+        await limiter(_request("10.0.1.1"))
+        assert list(limiter._buckets) == ["10.0.1.1"]
+
+class TestToolExecution:
+    """Tests for running a response's tool calls"""
+
+    @pytest.mark.asyncio
+    async def test_side_effect_free_calls_overlap_others_run_in_order(self):
+        """Only consecutive side-effect-free calls run concurrently; results keep call order"""
+        events = []
+
+        async def run_tool(call):
+            events.append(("start", call.name))
+            await asyncio.sleep(0.01)
+            events.append(("end", call.name))
+            if call.name == "read_bad":
+                raise ValueError("boom")
+            return call.name
+
+        calls = [ToolCall(name=name, args={}) for name in ("read_a", "read_bad", "write", "read_b")]
+        with patch.object(api, "_run_tool", run_tool), \
+                patch.object(api.registry, "is_side_effect_free", lambda name: name.startswith("read")):
+            results = [(call.name, result) async for call, result in api._iter_tool_results(calls)]
+
+        assert [name for name, _ in results] == ["read_a", "read_bad", "write", "read_b"]
+        assert isinstance(results[1][1], ValueError)
+        assert events[:2] == [("start", "read_a"), ("start", "read_bad")]
+        assert events.index(("start", "write")) > events.index(("end", "read_bad"))
+        assert events.index(("start", "read_b")) > events.index(("end", "write"))
@@ -6,6 +6,7 @@ import pytest
 import os
 import sys
 import asyncio
+import time
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to the path
@@ -48,6 +49,34 @@ class TestToolProtocol:
         
         assert len(calls) == 0
     
+    def test_tool_call_braces(self):
+        """Test that the brace scanner copes with stray and quoted braces"""
+        extract_tool_calls.cache_clear()
+        
+        # A stray "{" in prose before the call
+        calls = extract_tool_calls('Use { carefully. {"name": "web_search", "args": {"query": "a"}}')
+        assert [(c.name, c.args) for c in calls] == [("web_search", {"query": "a"})]
+        
+        # Nested objects and braces inside JSON strings
+        text = '{"name": "write_file", "args": {"file_path": "x.json", "content": "{\\"k\\": {1}}"}}'
+        calls = extract_tool_calls(text)
+        assert [(c.name, c.args) for c in calls] == [("write_file", {"file_path": "x.json", "content": '{"k": {1}}'})]
+        
+        # Unbalanced braces inside a string do not swallow the next call
+        text = '{"name": "read_file", "args": {"file_path": "a}b{.txt"}} then {"name": "list_files", "args": {}}'
+        calls = extract_tool_calls(text)
+        assert [c.name for c in calls] == ["read_file", "list_files"]
+        
+        # An unterminated object yields nothing
+        assert extract_tool_calls('{"name": "web_search", "args": {') == ()
+        
+        # Pathological input is scanned once, not rescanned per stray brace
+        start = time.perf_counter()
+        assert extract_tool_calls("{" * 50000 + '"name"') == ()
+        assert extract_tool_calls("{" * 50000 + "}" * 50000 + '"name"') == ()
+        assert extract_tool_calls('{"a":' * 50000 + '"name"' + "}" * 50000) == ()
+        assert time.perf_counter() - start < 2.0
+    
     def test_tool_registry(self):
         """Test the tool registry"""
         # Create a test tool
@@ -87,6 +116,67 @@ class TestToolProtocol:
         assert len(tools) > 0
         assert any(t["name"] == "test_tool" for t in tools)
 
+class TestFilesystemSandbox:
+    """Tests for the workspace check of the file tools"""
+    
+    def test_in_workspace(self, tmp_path, monkeypatch):
+        """Test that only paths inside the workspace are accepted"""
+        from torisai.tools import filesystem
+        
+        workspace = tmp_path / "work"
+        workspace.mkdir()
+        (tmp_path / "work-evil").mkdir()
+        monkeypatch.setattr(filesystem, "WORKSPACE", workspace.resolve())
+        monkeypatch.chdir(workspace)
+        
+        assert filesystem._in_workspace("notes.txt") == workspace.resolve() / "notes.txt"
+        assert filesystem._in_workspace(".") == workspace.resolve()
+        
+        # A sibling sharing the workspace prefix and a parent traversal are outside
+        assert filesystem._in_workspace("../work-evil/secret.txt") is None
+        assert filesystem._in_workspace(str(tmp_path / "work-evil")) is None
+        assert filesystem._in_workspace("../../etc/passwd") is None
+    
+    def test_symlink_escape(self, tmp_path, monkeypatch):
+        """Test that a symlink inside the workspace cannot point outside it"""
+        from torisai.tools import filesystem
+        
+        workspace = tmp_path / "work"
+        workspace.mkdir()
+        (tmp_path / "secret.txt").write_text("secret")
+        try:
+            os.symlink(tmp_path / "secret.txt", workspace / "link.txt")
+        except (OSError, NotImplementedError):
+            pytest.skip("Symlinks not supported")
+        monkeypatch.setattr(filesystem, "WORKSPACE", workspace.resolve())
+        monkeypatch.chdir(workspace)
+        
+        assert filesystem._in_workspace("link.txt") is None
+        assert filesystem.read_file("link.txt").startswith("Error")
+    
+    def test_delete_through_symlink_parent(self, tmp_path, monkeypatch):
+        """Test that delete_file removes exactly the path it checked"""
+        from torisai.tools import filesystem
+        
+        workspace = tmp_path / "work"
+        (workspace / "a").mkdir(parents=True)
+        (workspace / "b" / "c" / "d" / "e").mkdir(parents=True)
+        try:
+            os.symlink(workspace / "b" / "c" / "d" / "e", workspace / "a" / "link")
+        except (OSError, NotImplementedError):
+            pytest.skip("Symlinks not supported")
+        monkeypatch.setattr(filesystem, "WORKSPACE", workspace.resolve())
+        monkeypatch.chdir(workspace)
+        
+        # Resolves into the workspace, but a lexical ".." walk would leave it
+        assert filesystem.delete_file("a/link/../../..").startswith("Error")
+        assert workspace.exists() and (workspace / "b").exists()
+        
+        # The link itself is deleted, not its target
+        assert filesystem.delete_file("a/link").startswith("Successfully")
+        assert not os.path.lexists(workspace / "a" / "link")
+        assert (workspace / "b" / "c" / "d" / "e").is_dir()
+
 class TestAgents:
     """Tests for the agent modules"""
     
@@ -0,0 +1,133 @@
+"""
+TORIS AI - Memory Unit Tests
+Regression tests for history migration and keyword search
+"""
+import pytest
+import os
+import sys
+import json
+
+# Add the repository root to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from memory_manager import Memory
+
+LEGACY = [
+    {"user": "How do I deploy the app?", "ai": "Run the deploy script.", "timestamp": 1.0},
+    {"user": "What about rollbacks?", "ai": "Redeploy the previous tag.", "timestamp": 2.0},
+]
+
+def _write_legacy(directory, content):
+    """Write a legacy JSON array history file into directory"""
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "conversation_history.json").write_text(content)
+
+def _read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class TestMemoryMigration:
+    """Tests for converting the legacy JSON history of memory_manager.Memory"""
+
+    def test_legacy_history_is_converted(self, tmp_path):
+        """Every legacy entry ends up as one JSONL line"""
+        _write_legacy(tmp_path, json.dumps(LEGACY))
+        memory = Memory(str(tmp_path))
+        memory.close()
+
+        assert _read_jsonl(tmp_path / "conversation_history.jsonl") == LEGACY
+        assert not (tmp_path / "conversation_history.jsonl.tmp").exists()
+
+    def test_malformed_legacy_leaves_no_history(self, tmp_path):
+        """A failed conversion must not leave a partial JSONL file that blocks a retry"""
+        _write_legacy(tmp_path, '[{"user": "hi", "ai": ')
+
+        with pytest.raises(Exception):
+            Memory(str(tmp_path))
+
+        assert os.listdir(tmp_path) == ["conversation_history.json"]
+
+class TestBackendMigration:
+    """Tests for converting the legacy JSON history of backend.MemoryManager"""
+
+    @pytest.fixture(autouse=True)
+    def backend(self):
+        pytest.importorskip("requests")
+        pytest.importorskip("aiohttp")
+        import backend
+        return backend
+
+    def test_legacy_history_is_converted(self, backend, tmp_path):
+        _write_legacy(tmp_path, json.dumps(LEGACY))
+        manager = backend.MemoryManager(str(tmp_path), str(tmp_path / "chroma"))
+        manager._close()
+
+        assert _read_jsonl(tmp_path / "conversation_history.jsonl") == LEGACY
+
+    def test_malformed_legacy_leaves_no_history(self, backend, tmp_path):
+        _write_legacy(tmp_path, '[{"user": "hi", "ai": ')
+
+        with pytest.raises(Exception):
+            backend.MemoryManager(str(tmp_path), str(tmp_path / "chroma"))
+
+        assert os.listdir(tmp_path) == ["conversation_history.json"]
+
+class TestPackageMigration:
+    """Tests for converting the legacy JSON history of torisai.memory.manager.MemoryManager"""
+
+    @pytest.fixture(autouse=True)
+    def manager_module(self):
+        pytest.importorskip("chromadb")
+        from torisai.memory import manager
+        return manager
+
+    def _make(self, manager_module, tmp_path):
+        config = manager_module.MemoryConfig(
+            memory_dir=str(tmp_path / "memory"),
+            chroma_db_dir=str(tmp_path / "chroma")
+        )
+        return manager_module.MemoryManager(config)
+
+    def test_legacy_history_is_converted(self, manager_module, tmp_path):
+        _write_legacy(tmp_path / "memory", json.dumps(LEGACY))
+        manager = self._make(manager_module, tmp_path)
+
+        assert _read_jsonl(tmp_path / "memory" / "conversation_history.jsonl") == LEGACY
+        assert manager.get_conversation_history(10) == LEGACY
+
+    def test_malformed_legacy_leaves_no_history(self, manager_module, tmp_path):
+        _write_legacy(tmp_path / "memory", '[{"user": "hi", "ai": ')
+
+        with pytest.raises(Exception):
+            self._make(manager_module, tmp_path)
+
+        assert sorted(os.listdir(tmp_path / "memory")) == ["conversation_history.json"]
+
+class TestMemorySearch:
+    """Tests for keyword search with and without the full-text index"""
+
+    @pytest.fixture
+    def memory(self, tmp_path):
+        memory = Memory(str(tmp_path))
+        memory.add_interaction("How do I deploy the app to staging?", "Use the deploy script with --env staging.")
+        memory.add_interaction("Which database do we use?", "PostgreSQL 15 on the primary host.")
+        memory.add_interaction("Any plan to redeploy the workers?", "Not this week.")
+        memory.add_interaction("Does the Café menu load?", "Yes, the ÉCLAIR page too.")
+        yield memory
+        memory.close()
+
+    @pytest.mark.parametrize("query", ["depl", "DEPLOY", "database staging", "host", "café", "éclair", "ploy"])
+    def test_index_and_scan_agree(self, memory, query):
+        """The FTS query and the file scan apply the same word-prefix rule"""
+        scanned = [r["user"] for r in memory._scan_records(query.split(), 10)]
+        if memory._index is None:
+            pytest.skip("SQLite FTS5 not available")
+        indexed = [r["user"] for r in memory.search_memory(query, 10)]
+
+        assert indexed == scanned
+
+    def test_prefix_matches_word_starts_only(self, memory):
+        """'depl' matches deploy but not redeploy"""
+        users = [r["user"] for r in memory._scan_records(["depl"], 10)]
+
+        assert users == ["How do I deploy the app to staging?"]
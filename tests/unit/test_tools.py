@@ -0,0 +1,103 @@
+"""
+TORIS AI - Tools Unit Tests
+Regression tests for code execution and file sandboxing in tools.py
+"""
+import pytest
+import os
+import sys
+
+# Add the repository root to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools import Tools
+
+@pytest.fixture
+def tools(tmp_path):
+    """Tools instance with its directories under tmp_path; stops the code worker afterwards"""
+    instance = Tools(memory_dir=str(tmp_path / "memory"), temp_dir=str(tmp_path / "temp"))
+    yield instance
+    if instance._worker is not None:
+        instance._worker.kill()
+        instance._worker.wait()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Persistent code worker needs os.fork")
+class TestCodeWorker:
+    """Tests for the persistent Python code worker"""
+
+    def test_fd_level_output_is_captured(self, tools):
+        """Output written straight to fd 1 must not corrupt the worker framing"""
+        ok, output = tools._run_in_worker("import os\nos.system('echo from-shell')\nprint('done')")
+        assert ok
+        assert "from-shell" in output
+        assert "done" in output
+
+        # The worker is still in sync for the next snippet
+        assert tools._run_in_worker("print(1 + 1)") == (True, "2\n")
+
+    def test_state_does_not_leak_between_snippets(self, tools, tmp_path):
+        """Globals, cwd and imported modules die with each snippet"""
+        tools._run_in_worker(
+            f"import os, sys, json\nos.chdir({str(tmp_path)!r})\nleaked = 1\nsys.modules['leaky'] = json"
+        )
+        ok, output = tools._run_in_worker(
+            "import os, sys\nprint('leaked' in globals(), 'leaky' in sys.modules, os.getcwd())"
+        )
+        assert ok
+        assert output.split()[:2] == ["False", "False"]
+        assert output.split()[2] != str(tmp_path)
+
+    def test_errors_and_exit_codes(self, tools):
+        """Exceptions and non-zero exits are reported as failures with stderr"""
+        ok, output = tools._run_in_worker("raise ValueError('boom')")
+        assert not ok
+        assert "ValueError: boom" in output
+
+        assert tools._run_in_worker("import sys\nsys.exit(0)")[0]
+        assert not tools._run_in_worker("import sys\nsys.exit(3)")[0]
+
+class TestFileOperations:
+    """Tests for the memory/temp directory sandbox"""
+
+    def test_sibling_directory_is_rejected(self, tools, tmp_path):
+        """A directory that merely shares the memory dir's prefix is outside the sandbox"""
+        evil = tmp_path / "memory_evil"
+        evil.mkdir()
+        (evil / "secret.txt").write_text("secret")
+
+        result = tools.file_operations("read", str(evil / "secret.txt"))
+        assert result.startswith("Error: Access denied")
+
+    def test_symlink_escape_is_rejected(self, tools, tmp_path):
+        """A symlink inside the memory dir pointing outside it is rejected"""
+        outside = tmp_path / "outside.txt"
+        outside.write_text("secret")
+        link = tmp_path / "memory" / "link.txt"
+        try:
+            os.symlink(outside, link)
+        except (OSError, NotImplementedError):
+            pytest.skip("Symlinks not supported")
+
+        result = tools.file_operations("read", str(link))
+        assert result.startswith("Error: Access denied")
+
+    def test_memory_dir_is_accessible(self, tools, tmp_path):
+        """Files inside the memory dir can be written and read back"""
+        path = str(tmp_path / "memory" / "note.txt")
+        tools.file_operations("write", path, "hello")
+
+        assert tools.file_operations("read", path) == "hello"
+
+class TestExtractPage:
+    """Tests for page text extraction"""
+
+    def test_empty_body(self, tools):
+        """An empty response is reported instead of raising from lxml"""
+        assert tools._extract_page("http://example.com", b"").startswith("Error")
+        assert tools._extract_page("http://example.com", b"  \n").startswith("Error")
+
+    def test_response_charset_is_used(self, tools):
+        """The charset from the response headers decides how the body is decoded"""
+        page = "<html><body><p>café</p></body></html>"
+
+        assert tools._extract_page("http://example.com", page.encode("utf-8"), "utf-8") == "café"
+        assert tools._extract_page("http://example.com", page.encode("cp1252"), "windows-1252") == "café"
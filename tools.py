@@ -1,12 +1,29 @@
 # TORIS AI - Tools Module
 
-import requests
-from bs4 import BeautifulSoup
+import codecs
+import lxml.html
 import subprocess
 import sys
 import os
 import json
 import time
+import asyncio
+import itertools
+import threading
+
+from dir_utils import ensure_dir
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+HTTP_TIMEOUT = 10
+MAX_PAGE_BYTES = 512 * 1024  # Only the first 50000 chars of text are kept anyway
+EXEC_TIMEOUT = 30
+SEARCH_API_URL = "https://api.duckduckgo.com/"
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_code_worker.py")
 
 class Tools:
     """
@@ -19,11 +36,47 @@ class Tools:
         self.memory_dir = memory_dir
         self.temp_dir = temp_dir
         self.ensure_directories()
+        # Resolved once; the trailing separator stops "/memory_evil" matching "/memory"
+        self._memory_abs = os.path.realpath(self.memory_dir) + os.sep
+        self._temp_abs = os.path.realpath(self.temp_dir) + os.sep
+        self._session = None
+        self._async_session = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._have_node = None  # Probed on the first JavaScript execution
+        # Unique file ids: pid and start time separate runs, the counter separates calls
+        self._file_prefix = f"{os.getpid()}_{int(time.time())}"
+        self._seq = itertools.count()
+    
+    @property
+    def session(self):
+        """Pooled HTTP session, created (and requests imported) on first web access"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+    
+    @staticmethod
+    def _create_session():
+        """Create a pooled HTTP session so keep-alive connections are reused"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 503])
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
     
     def ensure_directories(self):
         """Ensure necessary directories exist"""
-        os.makedirs(self.memory_dir, exist_ok=True)
-        os.makedirs(self.temp_dir, exist_ok=True)
+        ensure_dir(self.memory_dir)
+        ensure_dir(self.temp_dir)
     
     def web_search(self, query):
         """
@@ -36,26 +89,38 @@ class Tools:
             str: Search results
         """
         try:
-            url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # DuckDuckGo's JSON API returns a few KB instead of a full results page to scrape
+            response = self.session.get(
+                SEARCH_API_URL,
+                params={"q": query, "format": "json", "no_html": "1", "no_redirect": "1"},
+                timeout=HTTP_TIMEOUT
+            )
+            data = _loads(response.content)
             results = []
             
-            for g in soup.find_all('div', class_='g'):
-                anchors = g.find_all('a')
-                if anchors:
-                    link = anchors[0]['href']
-                    title = g.find('h3').text if g.find('h3') else "No title"
-                    snippet = g.find('div', class_='VwiC3b').text if g.find('div', class_='VwiC3b') else "No snippet"
-                    results.append(f"Title: {title}\nLink: {link}\nSnippet: {snippet}\n")
+            for topic in self._iter_search_topics(data):
+                link = topic.get("FirstURL")
+                text = topic.get("Text")
+                if link and text:
+                    title = text.split(" - ", 1)[0]
+                    results.append(f"Title: {title}\nLink: {link}\nSnippet: {text}\n")
+                    if len(results) == 5:
+                        break
             
-            return "\n".join(results[:5]) if results else "No results found"
+            return "\n".join(results) if results else "No results found"
         except Exception as e:
             return f"Error performing web search: {str(e)}"
     
+    @staticmethod
+    def _iter_search_topics(data):
+        """Yield direct results, then related topics, flattening grouped topics"""
+        yield from data.get("Results", [])
+        for topic in data.get("RelatedTopics", []):
+            if "Topics" in topic:
+                yield from topic["Topics"]
+            else:
+                yield topic
+    
     def web_browse(self, url):
         """
         Browse a webpage and extract its content
@@ -67,29 +132,157 @@ class Tools:
             str: Extracted content
         """
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract main content, removing scripts, styles, etc.
-            for script in soup(["script", "style", "meta", "noscript"]):
-                script.extract()
-            
-            text = soup.get_text(separator='\n', strip=True)
-            
-            # Save a copy of the extracted content
-            timestamp = int(time.time())
-            content_file = os.path.join(self.memory_dir, f"webpage_{timestamp}.txt")
-            with open(content_file, 'w', encoding='utf-8') as f:
-                f.write(f"URL: {url}\n\n")
-                f.write(text[:50000])  # Limit to 50000 chars
-            
-            return text[:10000]  # Return first 10000 chars
+            body = bytearray()
+            with self.session.get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+                # requests assumes ISO-8859-1 for any text/* reply; only trust a declared charset
+                declared = "charset" in response.headers.get("Content-Type", "").lower()
+                encoding = response.encoding if declared else None
+                for chunk in response.iter_content(65536):
+                    body += chunk
+                    if len(body) >= MAX_PAGE_BYTES:
+                        break
+            return self._extract_page(url, bytes(body), encoding)
         except Exception as e:
             return f"Error browsing webpage: {str(e)}"
     
+    def _extract_page(self, url, body, encoding=None):
+        """
+        Extract the text of a downloaded page, save a copy and return the first 10000 chars
+        
+        Args:
+            url (str): URL the page was fetched from
+            body (bytes): Raw response body
+            encoding (str): Charset from the response headers; None lets lxml
+                use the page's own <meta charset> or detect it
+            
+        Returns:
+            str: Extracted content
+        """
+        if not body.strip():
+            return "Error browsing webpage: empty response"
+        
+        if encoding:
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                encoding = None
+        tree = lxml.html.fromstring(body, parser=lxml.html.HTMLParser(encoding=encoding))
+        
+        # Extract main content, removing scripts, styles, etc.
+        for el in tree.xpath('//script|//style|//meta|//noscript'):
+            el.drop_tree()
+        
+        text = "\n".join(t.strip() for t in tree.itertext() if t.strip())
+        
+        # Save a copy of the extracted content
+        content_file = os.path.join(self.memory_dir, f"webpage_{self._next_file_id()}.txt")
+        with open(content_file, 'w', encoding='utf-8') as f:
+            f.write(f"URL: {url}\n\n")
+            f.write(text[:50000])  # Limit to 50000 chars
+        
+        return text[:10000]  # Return first 10000 chars
+    
+    async def _get_async_session(self):
+        """Get the shared aiohttp session, creating it on first use"""
+        if self._async_session is None or self._async_session.closed:
+            import aiohttp
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=50, ttl_dns_cache=300, keepalive_timeout=60),
+                headers={"User-Agent": USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+            )
+        return self._async_session
+    
+    async def web_browse_many(self, urls):
+        """
+        Browse several webpages concurrently and extract their content
+        
+        Args:
+            urls (list): URLs to browse
+            
+        Returns:
+            list: Extracted content (or an error message) for each URL, in order
+        """
+        session = await self._get_async_session()
+        
+        async def browse(url):
+            try:
+                async with session.get(url) as response:
+                    body = bytearray()
+                    async for chunk in response.content.iter_chunked(65536):
+                        body += chunk
+                        if len(body) >= MAX_PAGE_BYTES:
+                            break
+                    encoding = response.charset
+                return self._extract_page(url, bytes(body), encoding)
+            except Exception as e:
+                return f"Error browsing webpage: {str(e)}"
+        
+        return await asyncio.gather(*(browse(url) for url in urls))
+    
+    async def close_async(self):
+        """Close the shared aiohttp session"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+    
+    def _run_in_worker(self, code):
+        """
+        Run Python code in the persistent worker process
+        
+        Each snippet runs in a child forked from the worker, with its output
+        redirected at the fd level, so it can neither corrupt the protocol nor
+        leave state behind for the next snippet.
+        
+        Returns:
+            tuple: (success, output)
+        
+        Raises:
+            subprocess.TimeoutExpired: The snippet ran past EXEC_TIMEOUT
+            OSError: The worker could not be started or had died before the request was sent
+        """
+        with self._worker_lock:
+            if self._worker is None or self._worker.poll() is not None:
+                self._worker = subprocess.Popen(
+                    [sys.executable, "-u", WORKER_SCRIPT, str(EXEC_TIMEOUT)],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+            worker = self._worker
+            
+            # The worker enforces EXEC_TIMEOUT itself; this only catches a hung worker
+            watchdog = threading.Timer(EXEC_TIMEOUT + 5, worker.kill)
+            watchdog.start()
+            try:
+                data = code.encode("utf-8")
+                worker.stdin.write(f"{len(data):010d}".encode("ascii") + data)
+                worker.stdin.flush()
+                header = worker.stdout.read(11)
+                if len(header) == 11 and header.isdigit():
+                    payload = worker.stdout.read(int(header[1:]))
+                    if len(payload) == int(header[1:]):
+                        status = header[:1]
+                        if status == b"2":
+                            raise subprocess.TimeoutExpired(WORKER_SCRIPT, EXEC_TIMEOUT)
+                        return status == b"0", payload.decode("utf-8", errors="replace")
+            finally:
+                watchdog.cancel()
+            
+            # Short read or malformed frame: the worker is out of sync, start a fresh one next time
+            worker.kill()
+            self._worker = None
+            return False, f"Code worker exited unexpectedly (code {worker.wait()})"
+    
+    def _next_file_id(self):
+        """Return an id for output file names that is unique within this process"""
+        return f"{self._file_prefix}_{next(self._seq)}"
+    
+    def _save_failed_code(self, code, extension):
+        """Keep a copy of code that failed to run in temp_dir for debugging"""
+        temp_file = os.path.join(self.temp_dir, f"code_{self._next_file_id()}.{extension}")
+        with open(temp_file, "w") as f:
+            f.write(code)
+    
     def execute_code(self, code, language="python"):
         """
         Execute code and return the result
@@ -103,14 +296,17 @@ class Tools:
         """
         try:
             if language.lower() == "python":
-                # Create a temporary file
-                timestamp = int(time.time())
-                temp_file = os.path.join(self.temp_dir, f"code_{timestamp}.py")
-                with open(temp_file, "w") as f:
-                    f.write(code)
+                # The worker forks per snippet, so it is only used where fork exists
+                if hasattr(os, "fork"):
+                    try:
+                        ok, output = self._run_in_worker(code)
+                        return output if ok else f"Error: {output}"
+                    except OSError:
+                        self._worker = None  # Worker unavailable, fall back to a one-off interpreter
                 
-                # Execute the code and capture output
-                result = subprocess.run([sys.executable, temp_file], 
+                # Pipe the code through stdin; -I keeps PYTHONPATH and user site out
+                result = subprocess.run([sys.executable, "-I", "-"], 
+                                       input=code,
                                        capture_output=True, 
                                        text=True,
                                        timeout=30)  # 30 second timeout for safety
@@ -119,31 +315,33 @@ class Tools:
                 if result.returncode == 0:
                     return result.stdout
                 else:
+                    self._save_failed_code(code, "py")
                     return f"Error: {result.stderr}"
             
             elif language.lower() == "javascript":
-                # Create a temporary file
-                timestamp = int(time.time())
-                temp_file = os.path.join(self.temp_dir, f"code_{timestamp}.js")
-                with open(temp_file, "w") as f:
-                    f.write(code)
-                
-                # Check if Node.js is available
-                try:
-                    subprocess.run(["node", "--version"], capture_output=True, check=True)
-                    # Execute the code and capture output
-                    result = subprocess.run(["node", temp_file], 
-                                           capture_output=True, 
-                                           text=True,
-                                           timeout=30)  # 30 second timeout for safety
-                    
-                    # Return the output or error
-                    if result.returncode == 0:
-                        return result.stdout
-                    else:
-                        return f"Error: {result.stderr}"
-                except:
+                # Check if Node.js is available (once per Tools instance)
+                if self._have_node is None:
+                    try:
+                        subprocess.run(["node", "--version"], capture_output=True, check=True, timeout=2)
+                        self._have_node = True
+                    except (subprocess.SubprocessError, OSError):
+                        self._have_node = False
+                if not self._have_node:
                     return "Node.js is not available. Please install Node.js to execute JavaScript code."
+                
+                # Execute the code and capture output
+                result = subprocess.run(["node", "-"], 
+                                       input=code,
+                                       capture_output=True, 
+                                       text=True,
+                                       timeout=30)  # 30 second timeout for safety
+                
+                # Return the output or error
+                if result.returncode == 0:
+                    return result.stdout
+                else:
+                    self._save_failed_code(code, "js")
+                    return f"Error: {result.stderr}"
             
             elif language.lower() in ["shell", "bash", "cmd"]:
                 # For security reasons, shell execution is limited
@@ -171,9 +369,12 @@ class Tools:
         try:
             # Sanitize path to prevent directory traversal
             # Only allow operations within memory_dir and temp_dir
-            abs_path = os.path.abspath(path)
-            if not (abs_path.startswith(os.path.abspath(self.memory_dir)) or 
-                    abs_path.startswith(os.path.abspath(self.temp_dir))):
+            # realpath also resolves symlinks that would point outside the sandbox
+            abs_path = os.path.realpath(path)
+            if os.path.isdir(abs_path):
+                abs_path += os.sep
+            if not (abs_path.startswith(self._memory_abs) or 
+                    abs_path.startswith(self._temp_abs)):
                 return "Error: Access denied. Operations are restricted to memory and temp directories."
             
             if operation.lower() == "list":
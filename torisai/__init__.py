@@ -7,26 +7,46 @@ from torisai.agents.specialized import get_agent
 
 __version__ = "2.0.0"
 
-# Import tools to register them
-import torisai.tools.secure_code
-import torisai.tools.web
-import torisai.tools.filesystem
+# Tool modules register themselves on import; defer that until the registry is queried
+registry.register_lazy("torisai.tools.secure_code", "torisai.tools.web", "torisai.tools.filesystem")
+
+_TOOL_MODULES = {"secure_code", "web", "filesystem"}
+
+def __getattr__(name):
+    """Import tool modules on first attribute access (PEP 562)"""
+    if name in _TOOL_MODULES:
+        import importlib
+        module = importlib.import_module(f"torisai.tools.{name}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module 'torisai' has no attribute {name!r}")
 
 # Initialize logging
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 
 # Create logs directory if it doesn't exist
 os.makedirs("./logs", exist_ok=True)
 
-# Configure logging
+# Configure logging: callers only enqueue records, a listener thread does the file I/O
+# (stopped at exit so queued records are drained before the handlers close)
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler("./logs/torisai.log"),
+    logging.StreamHandler(),
+    respect_handler_level=True
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("./logs/torisai.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger("torisai")
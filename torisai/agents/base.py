@@ -135,8 +135,7 @@ class Agent:
         if not history:
             return ""
         
-        context = "Previous conversation:\n"
-        for entry in history:
-            context += f"User: {entry['user']}\nAssistant: {entry['ai']}\n\n"
+        parts = ["Previous conversation:\n"]
+        parts.extend(f"User: {entry['user']}\nAssistant: {entry['ai']}\n\n" for entry in history)
         
-        return context
+        return "".join(parts)
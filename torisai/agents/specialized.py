@@ -3,6 +3,7 @@ TORIS AI - Specialized Agent Implementations
 Implements various agent types with specific capabilities
 """
 from typing import Dict, Any, List, Optional
+import functools
 import logging
 
 from torisai.agents.base import Agent, AgentConfig
@@ -105,24 +106,30 @@ Your goal is to help users gain deeper understanding of topics through thorough
         logger.info("Researcher agent initialized")
 
 
+_AGENT_CLASSES = {
+    "general": GeneralAgent,
+    "planner": PlannerAgent,
+    "coder": CoderAgent,
+    "researcher": ResearcherAgent,
+}
+
+@functools.lru_cache(maxsize=len(_AGENT_CLASSES))
+def _shared_agent(agent_type: str) -> Agent:
+    """Create the agent for a normalized type once; agents hold no per-request state"""
+    return _AGENT_CLASSES[agent_type]()
+
 # Factory function to get the appropriate agent
 def get_agent(agent_type: str = "general") -> Agent:
     """
-    Get an agent instance based on the specified type
+    Get the shared agent instance for the specified type
     
     Args:
-        agent_type: Type of agent to create (general, planner, coder, researcher)
+        agent_type: Type of agent to get (general, planner, coder, researcher)
         
     Returns:
         Agent instance
     """
     agent_type = agent_type.lower()
-    
-    if agent_type == "planner":
-        return PlannerAgent()
-    elif agent_type == "coder":
-        return CoderAgent()
-    elif agent_type == "researcher":
-        return ResearcherAgent()
-    else:
-        return GeneralAgent()
+    if agent_type not in _AGENT_CLASSES:
+        agent_type = "general"
+    return _shared_agent(agent_type)
@@ -2,28 +2,44 @@
 TORIS AI - FastAPI Backend
 Implements async API with proper authentication and rate limiting
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 import os
+import sys
+import hmac
 import json
+import time
 import asyncio
-from fastapi import FastAPI, WebSocket, HTTPException, Depends, Header, WebSocketDisconnect
+import inspect
+import functools
+import collections
+from fastapi import FastAPI, WebSocket, HTTPException, Depends, Header, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 from torisai.core.ollama_client import get_client, OllamaConfig
-from torisai.memory.manager import get_memory_manager, MemoryConfig
+from torisai.memory.manager import get_memory_manager, MemoryConfig, MemoryManager
 from torisai.core.tool_protocol import ToolCall, extract_tool_calls, registry
+from torisai.tools.secure_code import execute_code_async
+
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+    
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
 
 # Configure logging
 logger = logging.getLogger("torisai.api")
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# WebSocket streaming: flush buffered tokens once this many chars or seconds accumulate
+WS_CHUNK_CHARS = 64
+WS_CHUNK_INTERVAL = 0.01
 
 # Initialize security
 security = HTTPBearer()
@@ -35,10 +51,6 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# Add rate limit handler
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -81,6 +93,57 @@ class MemorySearchResponse(BaseModel):
     """Memory search response model"""
     results: List[Dict[str, Any]] = Field(..., description="Search results")
 
+# Rate limiting dependency
+class TokenBucket:
+    """
+    Per-client token bucket rate limiter
+    
+    Each client IP holds up to `capacity` tokens, refilled continuously at
+    `capacity / period` tokens per second; a request spends one token.
+    Buckets idle for a full period are dropped, so memory stays bounded
+    by the clients seen recently (and never exceeds `max_clients`).
+    """
+    
+    def __init__(self, capacity: int, period: float = 60.0, max_clients: int = 10000):
+        self.capacity = float(capacity)
+        self.period = period
+        self.rate = capacity / period
+        self.max_clients = max_clients
+        # client -> [tokens, last_refill], least recently seen first
+        self._buckets: Dict[str, List[float]] = collections.OrderedDict()
+    
+    def _evict(self, now: float) -> None:
+        """Drop buckets that have refilled completely, and the oldest ones beyond max_clients"""
+        buckets = self._buckets
+        while buckets:
+            last = next(iter(buckets.values()))[1]
+            # A dropped bucket is recreated full, so removing it changes nothing
+            if len(buckets) < self.max_clients and now - last < self.period:
+                break
+            buckets.popitem(last=False)
+    
+    async def __call__(self, request: Request) -> None:
+        client = request.client.host if request.client else "unknown"
+        now = time.monotonic()
+        self._evict(now)
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.capacity, now]
+        else:
+            self._buckets.move_to_end(client)
+        tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1.0:
+            bucket[0], bucket[1] = tokens, now
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(int((1.0 - tokens) / self.rate) + 1)},
+            )
+        bucket[0], bucket[1] = tokens - 1.0, now
+
+# API token, read once at import from the environment (default for local development)
+_API_TOKEN = os.environ.get("TORIS_API_TOKEN", "local-development-token").encode()
+
 # Authentication dependency
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
@@ -89,10 +152,8 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     In a production environment, this would validate against a secure token store
     For local use, we're using a simple environment variable
     """
-    # Get token from environment or use a default for local development
-    correct_token = os.environ.get("TORIS_API_TOKEN", "local-development-token")
-    
-    if credentials.credentials != correct_token:
+    # Constant-time comparison so response timing does not leak the token
+    if not hmac.compare_digest(credentials.credentials.encode(), _API_TOKEN):
         raise HTTPException(
             status_code=401,
             detail="Invalid authentication token",
@@ -100,6 +161,19 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
         )
     return credentials.credentials
 
+# Memory manager dependency; wraps get_memory_manager so its config argument
+# is not mistaken for a request body parameter
+def _memory_manager() -> MemoryManager:
+    """Resolve the shared memory manager once per request"""
+    return get_memory_manager()
+
+@app.on_event("shutdown")
+async def _close_web_client():
+    """Close the web tools' shared HTTP client if the module was loaded"""
+    web = sys.modules.get("torisai.tools.web")
+    if web is not None:
+        await web.close()
+
 # Routes
 @app.get("/")
 async def root():
@@ -119,11 +193,11 @@ async def health_check():
         "version": "2.0.0"
     }
 
-@app.post("/chat", response_model=ChatResponse)
-@limiter.limit("20/minute")
+@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(TokenBucket(20))])
 async def chat(
     request: ChatRequest,
-    token: str = Depends(verify_token)
+    token: str = Depends(verify_token),
+    memory_manager: MemoryManager = Depends(_memory_manager)
 ):
     """
     Chat with the AI
@@ -131,6 +205,7 @@ async def chat(
     Args:
         request: Chat request with message and agent type
         token: Authentication token
+        memory_manager: Shared memory manager
         
     Returns:
         AI response
@@ -139,9 +214,6 @@ async def chat(
         # Get Ollama client
         ollama_client = await get_client()
         
-        # Get memory manager
-        memory_manager = get_memory_manager()
-        
         # Get system prompt based on agent type
         system_prompt = _get_system_prompt(request.agent_type)
         
@@ -163,18 +235,15 @@ async def chat(
         memory_manager.save_interaction(request.message, response)
         
         # Process tool calls if any
-        tool_calls = extract_tool_calls(response)
+        tool_calls = [call for call in extract_tool_calls(response) if registry.get(call.name)]
         if tool_calls:
-            # Execute tool calls and append results
+            # Execute tool calls in order; only side-effect-free runs overlap
             tool_results = []
-            for call in tool_calls:
-                try:
-                    tool = registry.get(call.name)
-                    if tool:
-                        result = registry.execute(call)
-                        tool_results.append(f"Tool {call.name} result: {result}")
-                except Exception as e:
-                    tool_results.append(f"Error executing tool {call.name}: {str(e)}")
+            async for call, result in _iter_tool_results(tool_calls):
+                if isinstance(result, Exception):
+                    tool_results.append(f"Error executing tool {call.name}: {str(result)}")
+                else:
+                    tool_results.append(f"Tool {call.name} result: {result}")
             
             if tool_results:
                 response += "\n\n" + "\n".join(tool_results)
@@ -214,7 +283,7 @@ async def websocket_endpoint(websocket: WebSocket):
             
             try:
                 # Parse request
-                request = json.loads(data)
+                request = _loads(data)
                 message = request.get("message", "")
                 agent_type = request.get("agent_type", "General")
                 model = request.get("model")
@@ -230,68 +299,81 @@ async def websocket_endpoint(websocket: WebSocket):
                 full_prompt = f"{context}\n\nUser: {message}"
                 
                 # Send initial message
-                await websocket.send_json({
-                    "type": "start",
-                    "agent_type": agent_type
-                })
+                await websocket.send_text(_control_frame("start", agent_type))
                 
-                # Stream response
-                full_response = ""
+                # Stream response, coalescing tokens into fewer, larger messages
+                loop = asyncio.get_running_loop()
+                parts = []
+                pending = []
+                pending_len = 0
+                last_flush = loop.time()
                 async for chunk in ollama_client.stream_generate(
                     prompt=full_prompt,
                     model=model,
                     system_prompt=system_prompt
                 ):
-                    full_response += chunk
-                    await websocket.send_json({
+                    # Already-buffered chunks never suspend; yield so other clients get a turn
+                    if (len(parts) & 0x1F) == 0x1F:
+                        await asyncio.sleep(0)
+                    parts.append(chunk)
+                    pending.append(chunk)
+                    pending_len += len(chunk)
+                    now = loop.time()
+                    if pending_len >= WS_CHUNK_CHARS or now - last_flush >= WS_CHUNK_INTERVAL:
+                        await _send(websocket, {
+                            "type": "chunk",
+                            "content": "".join(pending)
+                        })
+                        pending.clear()
+                        pending_len = 0
+                        last_flush = now
+                if pending:
+                    await _send(websocket, {
                         "type": "chunk",
-                        "content": chunk
+                        "content": "".join(pending)
                     })
+                full_response = "".join(parts)
                 
                 # Save to memory
                 memory_manager.save_interaction(message, full_response)
+                await asyncio.sleep(0)
                 
                 # Process tool calls if any
                 tool_calls = extract_tool_calls(full_response)
                 if tool_calls:
-                    # Execute tool calls and append results
-                    for call in tool_calls:
-                        try:
-                            await websocket.send_json({
-                                "type": "tool_call",
+                    # Each result frame follows its own tool_call frame; unknown tools get no result
+                    is_known = [registry.get(call.name) is not None for call in tool_calls]
+                    results = _iter_tool_results([call for call, known in zip(tool_calls, is_known) if known])
+                    for call, known in zip(tool_calls, is_known):
+                        await _send(websocket, {
+                            "type": "tool_call",
+                            "name": call.name,
+                            "args": call.args
+                        })
+                        if not known:
+                            continue
+                        _, result = await results.__anext__()
+                        if isinstance(result, Exception):
+                            await _send(websocket, {
+                                "type": "tool_error",
                                 "name": call.name,
-                                "args": call.args
+                                "error": str(result)
                             })
-                            
-                            tool = registry.get(call.name)
-                            if tool:
-                                result = registry.execute(call)
-                                await websocket.send_json({
-                                    "type": "tool_result",
-                                    "name": call.name,
-                                    "result": result
-                                })
-                        except Exception as e:
-                            await websocket.send_json({
-                                "type": "tool_error",
+                        else:
+                            await _send(websocket, {
+                                "type": "tool_result",
                                 "name": call.name,
-                                "error": str(e)
+                                "result": result
                             })
                 
                 # Send completion message
-                await websocket.send_json({
-                    "type": "end",
-                    "agent_type": agent_type
-                })
+                await websocket.send_text(_control_frame("end", agent_type))
                 
             except json.JSONDecodeError:
-                await websocket.send_json({
-                    "type": "error",
-                    "message": "Invalid JSON"
-                })
+                await websocket.send_text(_INVALID_JSON_FRAME)
             except Exception as e:
                 logger.error(f"Error in WebSocket: {str(e)}")
-                await websocket.send_json({
+                await _send(websocket, {
                     "type": "error",
                     "message": str(e)
                 })
@@ -301,8 +383,7 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
 
-@app.post("/execute-code", response_model=CodeExecutionResponse)
-@limiter.limit("10/minute")
+@app.post("/execute-code", response_model=CodeExecutionResponse, dependencies=[Depends(TokenBucket(10))])
 async def execute_code(
     request: CodeExecutionRequest,
     token: str = Depends(verify_token)
@@ -318,11 +399,8 @@ async def execute_code(
         Execution output
     """
     try:
-        # Import here to avoid circular imports
-        from torisai.tools.secure_code import execute_code as exec_code
-        
-        # Execute code
-        output = exec_code(request.code, request.language)
+        # Docker runs as an asyncio subprocess, so the event loop keeps serving other requests
+        output = await execute_code_async(request.code, request.language)
         
         return CodeExecutionResponse(
             output=output,
@@ -336,11 +414,11 @@ async def execute_code(
             detail=f"Error executing code: {str(e)}"
         )
 
-@app.post("/memory/search", response_model=MemorySearchResponse)
-@limiter.limit("20/minute")
-async def search_memory(
+@app.post("/memory/search", response_model=MemorySearchResponse, dependencies=[Depends(TokenBucket(20))])
+def search_memory(
     request: MemorySearchRequest,
-    token: str = Depends(verify_token)
+    token: str = Depends(verify_token),
+    memory_manager: MemoryManager = Depends(_memory_manager)
 ):
     """
     Search memory for relevant conversations
@@ -348,14 +426,12 @@ async def search_memory(
     Args:
         request: Memory search request
         token: Authentication token
+        memory_manager: Shared memory manager
         
     Returns:
         Search results
     """
     try:
-        # Get memory manager
-        memory_manager = get_memory_manager()
-        
         # Search memory
         results = memory_manager.search_memory(request.query, request.limit)
         
@@ -367,22 +443,22 @@ async def search_memory(
             detail=f"Error searching memory: {str(e)}"
         )
 
-@app.delete("/memory/clear")
-@limiter.limit("5/minute")
-async def clear_memory(token: str = Depends(verify_token)):
+@app.delete("/memory/clear", dependencies=[Depends(TokenBucket(5))])
+def clear_memory(
+    token: str = Depends(verify_token),
+    memory_manager: MemoryManager = Depends(_memory_manager)
+):
     """
     Clear conversation history
     
     Args:
         token: Authentication token
+        memory_manager: Shared memory manager
         
     Returns:
         Success message
     """
     try:
-        # Get memory manager
-        memory_manager = get_memory_manager()
-        
         # Clear memory
         success = memory_manager.clear_history()
         
@@ -400,44 +476,88 @@ async def clear_memory(token: str = Depends(verify_token)):
             detail=f"Error clearing memory: {str(e)}"
         )
 
-# Helper functions
-def _get_system_prompt(agent_type: str) -> str:
-    """
-    Get system prompt based on agent type
-    
-    Args:
-        agent_type: Agent type (General, Planner, Coder, Researcher)
-        
-    Returns:
-        System prompt
-    """
-    if agent_type.lower() == "planner":
-        return """You are a planning assistant in the TORIS AI system. Your role is to help break down complex tasks into manageable steps.
+# System prompts, built once at import
+_PLANNER_PROMPT = """You are a planning assistant in the TORIS AI system. Your role is to help break down complex tasks into manageable steps.
 When given a task, analyze it carefully and create a structured plan with numbered steps.
 For each step, provide clear instructions and explain why it's important.
 Consider dependencies between steps and potential challenges.
 Your goal is to make complex tasks achievable through systematic planning."""
-    
-    elif agent_type.lower() == "coder":
-        return """You are a coding assistant in the TORIS AI system. Your role is to help write, debug, and explain code.
+
+_CODER_PROMPT = """You are a coding assistant in the TORIS AI system. Your role is to help write, debug, and explain code.
 Provide clean, well-commented code that follows best practices.
 When explaining code, break down complex concepts into understandable parts.
 Consider edge cases and potential errors in your solutions.
 Your goal is to help users implement robust software solutions."""
-    
-    elif agent_type.lower() == "researcher":
-        return """You are a research assistant in the TORIS AI system. Your role is to help find and analyze information.
+
+_RESEARCHER_PROMPT = """You are a research assistant in the TORIS AI system. Your role is to help find and analyze information.
 When asked a question, provide comprehensive, accurate information with proper context.
 Consider multiple perspectives and cite sources when possible.
 Distinguish between facts, opinions, and uncertainties in your responses.
 Your goal is to help users gain deeper understanding of topics through thorough research."""
-    
-    else:  # General
-        return """You are TORIS AI, a helpful assistant running locally on the user's computer.
+
+_GENERAL_PROMPT = """You are TORIS AI, a helpful assistant running locally on the user's computer.
 You can help with a wide range of tasks including answering questions, writing content, and solving problems.
 You have access to various tools including code execution, file operations, and memory storage.
 Your goal is to provide helpful, accurate, and thoughtful assistance."""
 
+_SYSTEM_PROMPTS = {
+    "planner": _PLANNER_PROMPT,
+    "coder": _CODER_PROMPT,
+    "researcher": _RESEARCHER_PROMPT,
+}
+
+# Helper functions
+async def _send(websocket: WebSocket, message: Dict[str, Any]) -> None:
+    """Send a JSON message as a text frame, encoded with orjson when available"""
+    await websocket.send_text(_dumps(message))
+
+async def _run_tool(call: ToolCall) -> Any:
+    """Execute a tool call in a worker thread, awaiting the result if the tool is async"""
+    result = await asyncio.to_thread(registry.execute, call)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+async def _iter_tool_results(calls: List[ToolCall]):
+    """
+    Run tool calls in order, yielding (call, result or exception) for each
+    
+    Calls run one at a time unless consecutive tools are all marked
+    side_effect_free, in which case that run executes concurrently.
+    """
+    i = 0
+    while i < len(calls):
+        j = i + 1
+        if registry.is_side_effect_free(calls[i].name):
+            while j < len(calls) and registry.is_side_effect_free(calls[j].name):
+                j += 1
+        tasks = [asyncio.ensure_future(_run_tool(call)) for call in calls[i:j]]
+        for call, task in zip(calls[i:j], tasks):
+            try:
+                yield call, await task
+            except Exception as e:
+                yield call, e
+        i = j
+
+@functools.lru_cache(maxsize=32)
+def _control_frame(kind: str, agent_type: str) -> str:
+    """Encoded start/end frame; the same few agent types repeat on every turn"""
+    return _dumps({"type": kind, "agent_type": agent_type})
+
+_INVALID_JSON_FRAME = _dumps({"type": "error", "message": "Invalid JSON"})
+
+def _get_system_prompt(agent_type: str) -> str:
+    """
+    Get system prompt based on agent type
+    
+    Args:
+        agent_type: Agent type (General, Planner, Coder, Researcher)
+        
+    Returns:
+        System prompt
+    """
+    return _SYSTEM_PROMPTS.get(agent_type.lower(), _GENERAL_PROMPT)
+
 def _prepare_context(history: List[Dict[str, Any]]) -> str:
     """
     Prepare context from conversation history
@@ -448,16 +568,19 @@ def _prepare_context(history: List[Dict[str, Any]]) -> str:
     Returns:
         Context string
     """
-    # Use the most recent exchanges for context
-    recent_history = history[-5:] if len(history) > 5 else history
-    
-    context = "Previous conversation:\n"
-    for entry in recent_history:
-        context += f"User: {entry['user']}\nAssistant: {entry['ai']}\n\n"
+    # Use the most recent exchanges for context; consecutive messages usually share them
+    return _build_context(tuple((entry['user'], entry['ai']) for entry in history[-5:]))
+
+@functools.lru_cache(maxsize=128)
+def _build_context(exchanges: Tuple[Tuple[str, str], ...]) -> str:
+    """Render (user, ai) exchanges as a context block, cached per distinct history"""
+    parts = ["Previous conversation:\n"]
+    parts.extend(f"User: {user}\nAssistant: {ai}\n\n" for user, ai in exchanges)
     
-    return context
+    return "".join(parts)
 
 # Run the app
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # "auto" selects uvloop when it is installed (not available on Windows)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto")
@@ -5,10 +5,15 @@ Implements asynchronous communication with Ollama API
 from typing import Dict, Any, Optional, List
 import httpx
 import logging
-import json
 import asyncio
+import functools
 from pydantic import BaseModel
 
+try:
+    from orjson import loads as _loads, JSONDecodeError as _JSONDecodeError
+except ImportError:
+    from json import loads as _loads, JSONDecodeError as _JSONDecodeError
+
 logger = logging.getLogger("torisai.core.ollama")
 
 class OllamaConfig(BaseModel):
@@ -18,6 +23,9 @@ class OllamaConfig(BaseModel):
     default_model: str = "llama3:8b"
     lightweight_model: str = "qwen:7b"
 
+# Validated once; shared by every client built without an explicit config
+_DEFAULT_CONFIG = OllamaConfig()
+
 class OllamaClient:
     """
     Asynchronous client for Ollama API
@@ -33,10 +41,15 @@ class OllamaClient:
         Args:
             config: Configuration for the client, uses default if not provided
         """
-        self.config = config or OllamaConfig()
+        self.config = config or _DEFAULT_CONFIG
         self.client = httpx.AsyncClient(
             base_url=self.config.base_url,
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=64,
+                keepalive_expiry=60.0
+            )
         )
         logger.info(f"Initialized Ollama client with base URL: {self.config.base_url}")
     
@@ -167,15 +180,19 @@ class OllamaClient:
                     yield f"Error: {error_msg}"
                     return
                 
-                async for chunk in response.aiter_text():
+                # Ollama streams NDJSON: one complete JSON object per line
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
                     try:
-                        # Each chunk is a JSON object with a "response" field
-                        data = json.loads(chunk)
-                        if "response" in data:
-                            yield data["response"]
-                    except json.JSONDecodeError:
-                        # If we can't parse the JSON, just yield the raw chunk
-                        yield chunk
+                        data = _loads(line)
+                    except _JSONDecodeError:
+                        logger.warning(f"Skipping malformed stream line: {line[:200]}")
+                        continue
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
         except Exception as e:
             error_msg = f"Error streaming text: {str(e)}"
             logger.error(error_msg)
@@ -185,27 +202,27 @@ class OllamaClient:
         """Close the client session"""
         await self.client.aclose()
 
-# Create a singleton instance
-_client = None
+# Shared client; construction is synchronous, so concurrent first calls cannot race
+@functools.lru_cache(maxsize=None)
+def _default_client() -> OllamaClient:
+    return OllamaClient()
 
 async def get_client(config: Optional[OllamaConfig] = None) -> OllamaClient:
     """
     Get the Ollama client singleton
     
     Args:
-        config: Optional configuration for the client
+        config: Optional configuration; when given, a separate client is built for it
         
     Returns:
         OllamaClient instance
     """
-    global _client
-    if _client is None:
-        _client = OllamaClient(config)
-    return _client
+    if config is not None:
+        return OllamaClient(config)
+    return _default_client()
 
 # Cleanup function to be registered with atexit
 async def _cleanup():
-    global _client
-    if _client is not None:
-        await _client.close()
-        _client = None
+    if _default_client.cache_info().currsize:
+        await _default_client().close()
+        _default_client.cache_clear()
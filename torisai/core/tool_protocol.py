@@ -2,11 +2,22 @@
 TORIS AI - Core Tool Protocol
 Implements structured tool calls with Pydantic validation
 """
-from typing import Dict, Any, List, Optional, Union, Callable
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable
 from pydantic import BaseModel, Field, validator
-import json
 import re
 import logging
+import importlib
+import functools
+import threading
+
+try:
+    import orjson
+    from orjson import loads as _loads, JSONDecodeError as _JSONDecodeError
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    from json import loads as _loads, dumps as _dumps, JSONDecodeError as _JSONDecodeError
 
 logger = logging.getLogger("torisai.tools")
 
@@ -22,78 +33,226 @@ class ToolDefinition(BaseModel):
     parameters: Dict[str, Any] = Field(default_factory=dict, description="Parameters the tool accepts")
     function: Callable = Field(..., description="Function to call when the tool is invoked")
     requires_confirmation: bool = Field(default=False, description="Whether this tool requires explicit user confirmation")
+    side_effect_free: bool = Field(default=False, description="Whether calls may run concurrently with other side-effect-free calls")
 
 class ToolRegistry:
     """Registry for all available tools"""
     
     def __init__(self):
         self._tools: Dict[str, ToolDefinition] = {}
+        # Plain dicts for the per-call dispatch path, kept in sync by register()
+        self._fast: Dict[str, Callable] = {}
+        self._confirm: Dict[str, bool] = {}
+        self._side_effect_free: Dict[str, bool] = {}
+        self._lazy_modules: List[str] = []
+        self._lazy_lock = threading.RLock()
+        # Rebuilt on demand and dropped whenever a tool is registered
+        self._tools_list_cache: Optional[List[Dict[str, Any]]] = None
+        self._tools_list_json: Optional[str] = None
+    
+    def register_lazy(self, *module_names: str) -> None:
+        """Record tool modules to import the first time the registry is queried"""
+        with self._lazy_lock:
+            self._lazy_modules.extend(module_names)
+    
+    def _load_lazy(self) -> None:
+        """Import any pending tool modules so they can register themselves
+
+        A module is only dropped from the pending list once its import succeeded,
+        so other threads wait for it instead of seeing a half-filled registry, and
+        an ImportError reaches the caller and is retried on the next query.
+        """
+        if not self._lazy_modules:
+            return
+        with self._lazy_lock:
+            while self._lazy_modules:
+                module_name = self._lazy_modules[0]
+                importlib.import_module(module_name)
+                # A module querying the registry while importing may already have dropped it
+                if module_name in self._lazy_modules:
+                    self._lazy_modules.remove(module_name)
     
     def register(self, tool_def: ToolDefinition) -> None:
         """Register a tool in the registry"""
         if tool_def.name in self._tools:
-            logger.warning(f"Tool {tool_def.name} already registered, overwriting")
+            logger.warning("Tool %s already registered, overwriting", tool_def.name)
         self._tools[tool_def.name] = tool_def
-        logger.info(f"Registered tool: {tool_def.name}")
+        self._fast[tool_def.name] = tool_def.function
+        self._confirm[tool_def.name] = tool_def.requires_confirmation
+        self._side_effect_free[tool_def.name] = tool_def.side_effect_free
+        self._tools_list_cache = None
+        self._tools_list_json = None
+        logger.info("Registered tool: %s", tool_def.name)
     
     def get(self, name: str) -> Optional[ToolDefinition]:
         """Get a tool by name"""
+        self._load_lazy()
         return self._tools.get(name)
     
     def list_tools(self) -> List[Dict[str, Any]]:
-        """List all available tools in a format suitable for LLM context"""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.parameters
-            }
-            for tool in self._tools.values()
-        ]
+        """
+        List all available tools in a format suitable for LLM context
+        The list is cached and shared between callers, so it must not be mutated
+        """
+        self._load_lazy()
+        if self._tools_list_cache is None:
+            self._tools_list_cache = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.parameters
+                }
+                for tool in self._tools.values()
+            ]
+        return self._tools_list_cache
+    
+    def list_tools_json(self) -> str:
+        """List all available tools as a JSON string ready to insert into a prompt"""
+        tools = self.list_tools()
+        if self._tools_list_json is None:
+            self._tools_list_json = _dumps(tools)
+        return self._tools_list_json
+    
+    def requires_confirmation(self, name: str) -> bool:
+        """Whether the named tool needs explicit user confirmation before running"""
+        self._load_lazy()
+        return self._confirm.get(name, False)
+    
+    def is_side_effect_free(self, name: str) -> bool:
+        """Whether the named tool only reads, so its calls may run concurrently"""
+        self._load_lazy()
+        return self._side_effect_free.get(name, False)
     
     def execute(self, call: ToolCall) -> Any:
         """Execute a tool call"""
-        tool = self.get(call.name)
-        if not tool:
-            raise ValueError(f"Unknown tool: {call.name}")
+        self._load_lazy()
+        name, args = call.name, call.args
+        fn = self._fast.get(name)
+        if fn is None:
+            raise ValueError(f"Unknown tool: {name}")
         
-        logger.info(f"Executing tool: {call.name} with args: {call.args}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Executing tool: %s with args: %s", name, args)
         try:
-            result = tool.function(**call.args)
-            return result
+            return fn(**args)
         except Exception as e:
-            logger.error(f"Error executing tool {call.name}: {str(e)}")
+            logger.error(f"Error executing tool {name}: {str(e)}")
             raise
 
-def extract_tool_calls(text: str) -> List[ToolCall]:
+_TOOL_MARKER = '"name"'
+_JSON_SPECIAL = re.compile(r'[{}"\\]')
+
+# Only spans that can be a JSON object are decoded, and none nested deeper than a
+# tool call plausibly is (deeply nested input also crashes some orjson versions)
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_MAX_JSON_DEPTH = 32
+_NOT_JSON = object()
+
+def _decode_span(text: str, start: int, end: int) -> Any:
+    """Decode text[start:end] as a JSON object, or return _NOT_JSON"""
+    if not _OBJECT_START.match(text, start):
+        return _NOT_JSON
+    try:
+        return _loads(text[start:end])
+    except _JSONDecodeError:
+        return _NOT_JSON
+
+def _decode_spans(text: str, spans: List[Tuple[int, int]]):
+    """Yield the outermost spans that decode, in text order, skipping spans inside a decoded one"""
+    covered = -1
+    for start, end in sorted(spans):
+        if start < covered:
+            continue
+        data = _decode_span(text, start, end)
+        if data is not _NOT_JSON:
+            covered = end
+            yield data
+
+def _iter_json_objects(text: str):
+    """
+    Yield each top-level JSON object embedded in text in a single left-to-right pass
+
+    Braces inside JSON strings are ignored; quotes outside an object are prose.
+    Open braces are kept on a stack, so a stray "{" never forces a rescan: when an
+    outermost span does not decode, or is never closed, the objects nested in it
+    that did close are tried instead.
+    """
+    stack: List[List[int]] = []  # [position, deepest stack size reached inside] per open brace
+    nested: List[Tuple[int, int]] = []  # Spans closed inside the current outermost one
+    in_string = False
+    skip_at = -1  # Index of a character escaped by a preceding backslash
+    for match in _JSON_SPECIAL.finditer(text):
+        i = match.start()
+        if i == skip_at:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                skip_at = i + 1
+            elif char == '"':
+                in_string = False
+        elif char == "{":
+            stack.append([i, len(stack) + 1])
+        elif stack:
+            if char == '"':
+                in_string = True
+            elif char == "}":
+                start, peak = stack.pop()
+                shallow = peak - len(stack) <= _MAX_JSON_DEPTH
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                    if shallow:
+                        nested.append((start, i + 1))
+                    continue
+                data = _decode_span(text, start, i + 1) if shallow else _NOT_JSON
+                if data is _NOT_JSON:
+                    # A stray "{" inside the span can make it invalid; fall back to what it contains
+                    yield from _decode_spans(text, nested)
+                else:
+                    yield data
+                nested = []
+    
+    # An unclosed "{" (usually prose) still leaves the objects after it
+    if stack:
+        yield from _decode_spans(text, nested)
+
+@functools.lru_cache(maxsize=512)
+def extract_tool_calls(text: str, validate: bool = False) -> Tuple[ToolCall, ...]:
     """
     Extract tool calls from LLM output text
-    Uses regex to find JSON-like structures that might be tool calls
+    Scans for balanced JSON objects and keeps those that look like tool calls
+
+    Results are memoized per text, so this must stay pure and callers must not
+    mutate the returned calls; use extract_tool_calls.cache_clear() in tests.
+    With validate=False, calls passing the shape check are built without running
+    pydantic validation; pass validate=True to get full field validation.
     """
-    # Pattern to match potential JSON objects
-    pattern = r'\{(?:[^{}]|(?R))*\}'
+    # Every tool call carries a "name" key; most responses have none, so skip parsing them
+    if _TOOL_MARKER not in text:
+        return ()
     
-    potential_jsons = re.findall(pattern, text)
     tool_calls = []
     
-    for json_str in potential_jsons:
+    for data in _iter_json_objects(text):
+        # Check if it looks like a tool call
+        if not isinstance(data, dict) or "name" not in data:
+            continue
+        name = data["name"]
+        args = data.get("args", {})
         try:
-            # Try to parse as JSON
-            data = json.loads(json_str)
-            
-            # Check if it looks like a tool call
-            if isinstance(data, dict) and "name" in data:
-                # Try to parse as ToolCall
-                tool_call = ToolCall(
-                    name=data.get("name"),
-                    args=data.get("args", {})
-                )
-                tool_calls.append(tool_call)
-        except (json.JSONDecodeError, ValueError):
-            # Not valid JSON or not a valid tool call, skip
+            if validate:
+                tool_call = ToolCall(name=name, args=args)
+            elif isinstance(name, str) and isinstance(args, dict):
+                # Shape already checked, skip the validator
+                tool_call = ToolCall.construct(name=name, args=args)
+            else:
+                continue
+            tool_calls.append(tool_call)
+        except ValueError:
+            # Not a valid tool call, skip
             continue
     
-    return tool_calls
+    return tuple(tool_calls)
 
 # Create a global registry instance
 registry = ToolRegistry()
@@ -21,53 +21,87 @@ import uvicorn
 
 logger = logging.getLogger("torisai.main")
 
-async def check_dependencies():
-    """Check if all dependencies are installed and available"""
+async def _check_ollama() -> bool:
+    """Check that Ollama is running and has models available"""
+    from torisai.core.ollama_client import get_client
+    client = await get_client()
+    
+    if not await client.check_status():
+        logger.warning("Ollama is not running. Some features may not work properly.")
+        print("WARNING: Ollama is not running. Please start Ollama for full functionality.")
+        return False
+    
+    logger.info("Ollama is running")
+    
+    # Check available models
+    models = await client.list_models()
+    if models:
+        logger.info(f"Available models: {', '.join(models)}")
+    else:
+        logger.warning("No models found in Ollama")
+        print("WARNING: No models found in Ollama. Please pull models for full functionality.")
+        print("Recommended: Run 'ollama pull llama3:8b' or 'ollama pull qwen:7b'")
+    return True
+
+def _import_chromadb():
+    import chromadb
+
+async def _check_chroma() -> bool:
+    """Check that ChromaDB can be imported"""
     try:
-        # Check Ollama
-        from torisai.core.ollama_client import get_client
-        client = await get_client()
-        ollama_status = await client.check_status()
-        
-        if not ollama_status:
-            logger.warning("Ollama is not running. Some features may not work properly.")
-            print("WARNING: Ollama is not running. Please start Ollama for full functionality.")
-        else:
-            logger.info("Ollama is running")
-            
-            # Check available models
-            models = await client.list_models()
-            if models:
-                logger.info(f"Available models: {', '.join(models)}")
-            else:
-                logger.warning("No models found in Ollama")
-                print("WARNING: No models found in Ollama. Please pull models for full functionality.")
-                print("Recommended: Run 'ollama pull llama3:8b' or 'ollama pull qwen:7b'")
-        
-        # Check ChromaDB
-        try:
-            import chromadb
-            logger.info("ChromaDB is available")
-        except ImportError:
-            logger.warning("ChromaDB is not installed. Memory features may not work properly.")
-            print("WARNING: ChromaDB is not installed. Memory features may not work properly.")
-        
-        # Check Docker for secure code execution
-        try:
-            import docker
-            client = docker.from_env()
-            client.ping()
-            logger.info("Docker is available for secure code execution")
-        except Exception as e:
-            logger.warning(f"Docker is not available: {str(e)}. Code execution will be limited.")
-            print("WARNING: Docker is not available. Code execution will be limited.")
-        
+        # The import is slow, so keep it off the event loop
+        await asyncio.to_thread(_import_chromadb)
+        logger.info("ChromaDB is available")
+        return True
+    except ImportError:
+        logger.warning("ChromaDB is not installed. Memory features may not work properly.")
+        print("WARNING: ChromaDB is not installed. Memory features may not work properly.")
+        return False
+
+def _ping_docker():
+    import docker
+    docker.from_env().ping()
+
+async def _check_docker() -> bool:
+    """Check that Docker is reachable for secure code execution"""
+    try:
+        await asyncio.to_thread(_ping_docker)
+        logger.info("Docker is available for secure code execution")
         return True
-    
     except Exception as e:
-        logger.error(f"Error checking dependencies: {str(e)}")
+        logger.warning(f"Docker is not available: {str(e)}. Code execution will be limited.")
+        print("WARNING: Docker is not available. Code execution will be limited.")
         return False
 
+async def check_dependencies():
+    """Check if all dependencies are installed and available"""
+    # Probe concurrently so startup waits for the slowest check, not the sum
+    results = await asyncio.gather(
+        _check_ollama(),
+        _check_chroma(),
+        _check_docker(),
+        return_exceptions=True
+    )
+    
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f"Error checking dependencies: {str(result)}")
+            return False
+    
+    return True
+
+async def _run_startup_checks() -> bool:
+    """Run check_dependencies, then close the Ollama client it created
+    
+    The check runs in a throwaway loop; the cached client's pooled connections
+    belong to that loop, so the server's loop must start with a fresh client.
+    """
+    from torisai.core import ollama_client
+    try:
+        return await check_dependencies()
+    finally:
+        await ollama_client._cleanup()
+
 def ensure_directories():
     """Ensure all required directories exist"""
     directories = [
@@ -92,10 +126,17 @@ def parse_arguments():
     
     return parser.parse_args()
 
-async def main():
+def main():
     """Main entry point for TORIS AI"""
     print("Starting TORIS AI...")
     
+    # Use uvloop for the dependency check as well when it is available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Parse arguments
     args = parse_arguments()
     
@@ -113,21 +154,25 @@ async def main():
     # Ensure directories exist
     ensure_directories()
     
-    # Check dependencies
-    deps_ok = await check_dependencies()
+    # Check dependencies; uvicorn starts its own loop, so this one must be closed first
+    deps_ok = asyncio.run(_run_startup_checks())
     if not deps_ok:
         print("WARNING: Some dependencies are missing. TORIS AI may not function properly.")
     
     # Start the API server
     print(f"Starting API server on http://{args.host}:{args.port}")
     
-    # Run the API server
+    # Run the API server; "auto" picks uvloop and httptools from uvicorn[standard]
+    # and falls back to asyncio/h11 where they are unavailable (uvloop has no Windows build)
     uvicorn.run(
         api_app,
         host=args.host,
         port=args.port,
-        log_level="debug" if args.debug else "info"
+        loop="auto",
+        http="auto",
+        log_level="debug" if args.debug else "info",
+        access_log=args.debug
     )
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
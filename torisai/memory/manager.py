@@ -8,19 +8,35 @@ import json
 import time
 import logging
 import atexit
+import functools
+import threading
+import uuid
 import chromadb
 from chromadb.config import Settings
 from pydantic import BaseModel
 
+try:
+    import orjson
+    
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    
+    _loads = json.loads
+
 logger = logging.getLogger("torisai.memory")
 
 class MemoryConfig(BaseModel):
     """Configuration for memory manager"""
     memory_dir: str = "./memory"
     chroma_db_dir: str = "./chroma_db"
-    conversation_file: str = "conversation_history.json"
+    conversation_file: str = "conversation_history.jsonl"
     embedding_model: str = "all-MiniLM-L6-v2"
     ttl: int = 60 * 60 * 24 * 7  # 7 days in seconds
+    vector_batch_size: int = 16  # entries buffered before one collection.add
+    vector_flush_interval: float = 5.0  # max seconds an entry waits for the vector store
 
 class ConversationEntry(BaseModel):
     """A single conversation entry"""
@@ -29,6 +45,16 @@ class ConversationEntry(BaseModel):
     timestamp: float
     metadata: Dict[str, Any] = {}
 
+@functools.lru_cache(maxsize=4)
+def _get_embedding_fn(model_name: str):
+    """Load the embedding function once per model name for the whole process"""
+    try:
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+        return SentenceTransformerEmbeddingFunction(model_name=model_name)
+    except ImportError:
+        logger.warning("SentenceTransformer not available, using default embedding")
+        return None
+
 class MemoryManager:
     """
     Manager for conversation memory and vector storage
@@ -55,9 +81,22 @@ class MemoryManager:
             self.config.memory_dir, 
             self.config.conversation_file
         )
-        if not os.path.exists(self.conversation_file):
-            with open(self.conversation_file, "w") as f:
-                json.dump([], f)
+        self.legacy_conversation_file = os.path.splitext(self.conversation_file)[0] + ".json"
+        
+        # Convert a legacy JSON array history to JSONL once
+        self._migrate_legacy_history()
+        
+        # In-memory mirror of the history file, read once and appended to per turn
+        self._history: List[Dict[str, Any]] = self._load_history()
+        
+        # Vector store writes are buffered and embedded in batches
+        self._pending_docs: List[str] = []
+        self._pending_meta: List[Dict[str, Any]] = []
+        self._pending_ids: List[str] = []
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # Flushes a partial batch once it has waited vector_flush_interval, even if no more turns arrive
+        self._flush_timer: Optional[threading.Timer] = None
         
         # Initialize Chroma client
         self._initialize_chroma()
@@ -67,6 +106,55 @@ class MemoryManager:
         
         logger.info("Memory manager initialized")
     
+    def _migrate_legacy_history(self):
+        """
+        Rewrite the legacy JSON array history as JSONL if no JSONL file exists yet
+        
+        A legacy file that cannot be converted raises, leaving no JSONL behind, so
+        history is never silently started afresh over an unmigrated file.
+        """
+        if os.path.exists(self.conversation_file):
+            return
+        
+        # Convert into a temp file and swap it in only once the whole history is written,
+        # so a malformed legacy file or a crash never leaves a partial history behind
+        temp_file = self.conversation_file + ".tmp"
+        try:
+            history = []
+            if self.legacy_conversation_file != self.conversation_file:
+                try:
+                    with open(self.legacy_conversation_file, "rb") as f:
+                        history = _loads(f.read())
+                except FileNotFoundError:
+                    pass
+            with open(temp_file, "wb") as out:
+                for entry in history:
+                    out.write(_dumps(entry) + b"\n")
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_file, self.conversation_file)
+            if history:
+                logger.info(f"Migrated {len(history)} entries to {self.conversation_file}")
+        except BaseException as e:
+            # Leave no JSONL behind, so the migration is retried on the next start
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            logger.error(f"Error migrating legacy memory: {str(e)}")
+            raise
+    
+    def _load_history(self) -> List[Dict[str, Any]]:
+        """Read every entry from the JSONL history file"""
+        try:
+            with open(self.conversation_file, "rb") as f:
+                return [_loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.error(f"Error loading memory: {str(e)}")
+            return []
+    
     def _initialize_chroma(self):
         """Initialize the Chroma client and collection"""
         try:
@@ -92,12 +180,7 @@ class MemoryManager:
     
     def _get_embedding_function(self):
         """Get the embedding function for Chroma"""
-        try:
-            from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-            return SentenceTransformerEmbeddingFunction(model_name=self.config.embedding_model)
-        except ImportError:
-            logger.warning("SentenceTransformer not available, using default embedding")
-            return None
+        return _get_embedding_fn(self.config.embedding_model)
     
     def save_interaction(self, user_message: str, ai_response: str, metadata: Dict[str, Any] = None) -> bool:
         """
@@ -112,47 +195,71 @@ class MemoryManager:
             True if successful, False otherwise
         """
         try:
-            # Create entry
-            entry = ConversationEntry(
+            # Create entry; fields are built here, so skip validation
+            entry = ConversationEntry.construct(
                 user=user_message,
                 ai=ai_response,
                 timestamp=time.time(),
                 metadata=metadata or {}
             )
             
-            # Load existing history
-            history = self.get_conversation_history(limit=0)
-            
-            # Add new entry
-            history.append(entry.dict())
+            # Append one JSON line; earlier entries are never rewritten
+            record = entry.dict()
+            with open(self.conversation_file, "ab") as f:
+                f.write(_dumps(record) + b"\n")
+            self._history.append(record)
             
-            # Save updated history
-            with open(self.conversation_file, "w") as f:
-                json.dump(history, f, indent=2)
-            
-            # Add to vector store if available
+            # Queue for the vector store if available
             if self.conversation_collection is not None:
-                try:
+                with self._pending_lock:
                     # Create a combined text for embedding
-                    combined_text = f"User: {user_message}\nAI: {ai_response}"
-                    
-                    # Generate a unique ID
-                    entry_id = f"entry_{int(entry.timestamp * 1000)}"
-                    
-                    # Add to collection
-                    self.conversation_collection.add(
-                        documents=[combined_text],
-                        metadatas=[entry.dict()],
-                        ids=[entry_id]
-                    )
-                except Exception as e:
-                    logger.error(f"Error adding to vector store: {str(e)}")
+                    self._pending_docs.append(f"User: {user_message}\nAI: {ai_response}")
+                    self._pending_meta.append(entry.dict())
+                    # Generate a unique ID; timestamps collide for turns saved in the same millisecond
+                    self._pending_ids.append(f"entry_{uuid.uuid4().hex}")
+                    if self._flush_timer is None:
+                        self._flush_timer = threading.Timer(self.config.vector_flush_interval, self.flush)
+                        self._flush_timer.daemon = True
+                        self._flush_timer.start()
+                self._maybe_flush()
             
             return True
         except Exception as e:
             logger.error(f"Error saving to memory: {str(e)}")
             return False
     
+    def _maybe_flush(self):
+        """Flush queued vector store entries once the batch is full or old enough"""
+        if (len(self._pending_ids) >= self.config.vector_batch_size
+                or time.monotonic() - self._last_flush >= self.config.vector_flush_interval):
+            self.flush()
+    
+    def flush(self):
+        """Add all queued entries to the vector store in a single batch"""
+        with self._pending_lock:
+            docs, metas, ids = self._pending_docs, self._pending_meta, self._pending_ids
+            self._pending_docs, self._pending_meta, self._pending_ids = [], [], []
+            self._last_flush = time.monotonic()
+            self._cancel_flush_timer()
+        
+        if not ids or self.conversation_collection is None:
+            return
+        
+        try:
+            self.conversation_collection.add(
+                documents=docs,
+                metadatas=metas,
+                ids=ids
+            )
+        except Exception as e:
+            logger.error(f"Error adding to vector store: {str(e)}")
+    
+    def _cancel_flush_timer(self):
+        """Stop the pending flush timer; call with _pending_lock held"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+    
     def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get recent conversation history
@@ -163,17 +270,8 @@ class MemoryManager:
         Returns:
             List of conversation entries
         """
-        try:
-            if os.path.exists(self.conversation_file):
-                with open(self.conversation_file, "r") as f:
-                    history = json.load(f)
-                
-                # Return most recent entries
-                return history[-limit:] if limit > 0 else history
-            return []
-        except Exception as e:
-            logger.error(f"Error retrieving memory: {str(e)}")
-            return []
+        # Return most recent entries
+        return self._history[-limit:] if limit > 0 else list(self._history)
     
     def get_formatted_history(self, limit: int = 10) -> str:
         """
@@ -190,12 +288,10 @@ class MemoryManager:
         if not history:
             return "No conversation history found."
         
-        formatted_history = ""
-        for entry in history:
-            formatted_history += f"User: {entry['user']}\n"
-            formatted_history += f"AI: {entry['ai']}\n\n"
-        
-        return formatted_history
+        return "".join(
+            f"User: {entry['user']}\nAI: {entry['ai']}\n\n"
+            for entry in history
+        )
     
     def search_memory(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -212,6 +308,9 @@ class MemoryManager:
             logger.warning("Vector store not available, falling back to recent history")
             return self.get_conversation_history(limit)
         
+        # Make recent interactions searchable
+        self.flush()
+        
         try:
             results = self.conversation_collection.query(
                 query_texts=[query],
@@ -236,13 +335,21 @@ class MemoryManager:
         """
         try:
             # Clear file
-            with open(self.conversation_file, "w") as f:
-                json.dump([], f)
+            open(self.conversation_file, "wb").close()
+            self._history = []
             
-            # Clear vector store if available
+            # Drop queued entries and clear vector store if available
+            with self._pending_lock:
+                self._pending_docs, self._pending_meta, self._pending_ids = [], [], []
+                self._cancel_flush_timer()
             if self.conversation_collection is not None:
                 try:
-                    self.conversation_collection.delete(where={})
+                    # Dropping and recreating the collection avoids a server-side scan of every entry
+                    self.chroma_client.delete_collection("conversations")
+                    self.conversation_collection = self.chroma_client.get_or_create_collection(
+                        name="conversations",
+                        embedding_function=self._get_embedding_function()
+                    )
                 except Exception as e:
                     logger.error(f"Error clearing vector store: {str(e)}")
             
@@ -254,6 +361,7 @@ class MemoryManager:
     def _cleanup(self):
         """Clean up resources"""
         try:
+            self.flush()
             if self.chroma_client is not None:
                 # Persist changes
                 self.chroma_client.persist()
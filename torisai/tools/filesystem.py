@@ -7,6 +7,9 @@ import logging
 import os
 import json
 import shutil
+import functools
+import pathlib
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field
 
 from torisai.core.tool_protocol import registry, ToolDefinition
@@ -21,6 +24,28 @@ class FileInfo(BaseModel):
     is_dir: bool
     modified: str
 
+# Resolved once; every tool call is confined to this directory
+WORKSPACE = pathlib.Path.cwd().resolve()
+
+def _in_workspace(path: str) -> Optional[pathlib.Path]:
+    """Resolve path and return it if it lies inside the workspace, else None"""
+    resolved = pathlib.Path(path).resolve()
+    if resolved == WORKSPACE or WORKSPACE in resolved.parents:
+        return resolved
+    return None
+
+# Number of decoded files kept by read_file; 0 disables the cache
+READ_CACHE_MAX = int(os.environ.get("TORISAI_READ_CACHE_MAX", "128"))
+
+def _read_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    """Read at most size bytes of a file; mtime_ns only serves as part of the cache key"""
+    # Bounded by the stat'ed size, so a file growing after the check can't overrun it
+    with open(file_path, "rb") as f:
+        return f.read(size).decode("utf-8", errors="replace")
+
+if READ_CACHE_MAX > 0:
+    _read_cached = functools.lru_cache(maxsize=READ_CACHE_MAX)(_read_cached)
+
 def list_files(directory: str = "./") -> List[FileInfo]:
     """
     List files in a directory
@@ -32,33 +57,33 @@ def list_files(directory: str = "./") -> List[FileInfo]:
         List of file information
     """
     try:
-        logger.info(f"Listing files in: {directory}")
+        logger.info("Listing files in: %s", directory)
         
         # Ensure the directory is within the allowed workspace
-        directory = os.path.abspath(directory)
-        workspace_dir = os.path.abspath("./")
-        
-        if not directory.startswith(workspace_dir):
-            logger.warning(f"Attempted to access directory outside workspace: {directory}")
+        resolved = _in_workspace(directory)
+        if resolved is None:
+            logger.warning("Attempted to access directory outside workspace: %s", directory)
             return []
+        directory = str(resolved)
         
         # List files
         files = []
-        for item in os.listdir(directory):
-            item_path = os.path.join(directory, item)
-            try:
-                stat = os.stat(item_path)
-                files.append(
-                    FileInfo(
-                        name=item,
-                        path=item_path,
-                        size=stat.st_size,
-                        is_dir=os.path.isdir(item_path),
-                        modified=stat.st_mtime
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    # DirEntry caches type info from the directory read
+                    stat = entry.stat()
+                    files.append(
+                        FileInfo.construct(
+                            name=entry.name,
+                            path=entry.path,
+                            size=stat.st_size,
+                            is_dir=entry.is_dir(),
+                            modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+                        )
                     )
-                )
-            except Exception as e:
-                logger.error(f"Error getting info for {item_path}: {str(e)}")
+                except Exception as e:
+                    logger.error(f"Error getting info for {entry.path}: {str(e)}")
         
         return files
     
@@ -78,29 +103,26 @@ def read_file(file_path: str, max_size: int = 1024 * 1024) -> str:
         File content
     """
     try:
-        logger.info(f"Reading file: {file_path}")
+        logger.info("Reading file: %s", file_path)
         
         # Ensure the file is within the allowed workspace
-        file_path = os.path.abspath(file_path)
-        workspace_dir = os.path.abspath("./")
-        
-        if not file_path.startswith(workspace_dir):
-            logger.warning(f"Attempted to access file outside workspace: {file_path}")
+        resolved = _in_workspace(file_path)
+        if resolved is None:
+            logger.warning("Attempted to access file outside workspace: %s", file_path)
             return "Error: Cannot access files outside the workspace"
+        file_path = str(resolved)
         
-        # Check if file exists
-        if not os.path.exists(file_path):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
             return f"Error: File not found: {file_path}"
         
         # Check if file is too large
-        if os.path.getsize(file_path) > max_size:
+        if stat.st_size > max_size:
             return f"Error: File is too large (max {max_size} bytes)"
         
-        # Read file
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        return content
+        # Unchanged files are served from memory; a new mtime or size is a new key
+        return _read_cached(file_path, stat.st_mtime_ns, stat.st_size)
     
     except Exception as e:
         logger.error(f"Error reading file: {str(e)}")
@@ -119,15 +141,14 @@ def write_file(file_path: str, content: str, append: bool = False) -> str:
         Success message
     """
     try:
-        logger.info(f"Writing to file: {file_path}")
+        logger.info("Writing to file: %s", file_path)
         
         # Ensure the file is within the allowed workspace
-        file_path = os.path.abspath(file_path)
-        workspace_dir = os.path.abspath("./")
-        
-        if not file_path.startswith(workspace_dir):
-            logger.warning(f"Attempted to write to file outside workspace: {file_path}")
+        resolved = _in_workspace(file_path)
+        if resolved is None:
+            logger.warning("Attempted to write to file outside workspace: %s", file_path)
             return "Error: Cannot write to files outside the workspace"
+        file_path = str(resolved)
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -154,22 +175,26 @@ def delete_file(file_path: str) -> str:
         Success message
     """
     try:
-        logger.info(f"Deleting file: {file_path}")
-        
-        # Ensure the file is within the allowed workspace
-        file_path = os.path.abspath(file_path)
-        workspace_dir = os.path.abspath("./")
+        logger.info("Deleting file: %s", file_path)
         
-        if not file_path.startswith(workspace_dir):
-            logger.warning(f"Attempted to delete file outside workspace: {file_path}")
+        # Resolve only the parent, so a link is deleted rather than the file it
+        # points to, and the path that is checked is the path that is deleted
+        stripped = file_path.rstrip(os.sep + (os.altsep or "")) or file_path
+        name = os.path.basename(stripped)
+        if name in ("", ".", ".."):
+            return f"Error: Cannot delete {file_path}"
+        parent = _in_workspace(os.path.dirname(stripped) or ".")
+        if parent is None:
+            logger.warning("Attempted to delete file outside workspace: %s", file_path)
             return "Error: Cannot delete files outside the workspace"
+        file_path = str(parent / name)
         
         # Check if file exists
-        if not os.path.exists(file_path):
+        if not os.path.lexists(file_path):
             return f"Error: File not found: {file_path}"
         
         # Delete file
-        if os.path.isdir(file_path):
+        if os.path.isdir(file_path) and not os.path.islink(file_path):
             shutil.rmtree(file_path)
         else:
             os.remove(file_path)
@@ -193,7 +218,8 @@ registry.register(
             }
         },
         function=list_files,
-        requires_confirmation=False
+        requires_confirmation=False,
+        side_effect_free=True
     )
 )
 
@@ -213,7 +239,8 @@ registry.register(
             }
         },
         function=read_file,
-        requires_confirmation=False
+        requires_confirmation=False,
+        side_effect_free=True
     )
 )
 
@@ -2,14 +2,17 @@
 TORIS AI - Secure Code Execution
 Implements Docker-based sandboxing for code execution
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import subprocess
+import asyncio
 import os
-import tempfile
 import logging
 import time
 import uuid
-import shutil
+import queue
+import atexit
+import functools
+import threading
 
 logger = logging.getLogger("torisai.tools.secure_code")
 
@@ -18,6 +21,21 @@ DEFAULT_TIMEOUT = 5  # seconds
 DEFAULT_MEMORY_LIMIT = "256m"
 DEFAULT_NETWORK = "none"
 MAX_OUTPUT_SIZE = 4096  # characters
+DEFAULT_POOL_SIZE = 2  # idle containers kept warm per image
+DEFAULT_MAX_USES = 50  # executions before a pooled container is replaced
+CONTAINER_START_TIMEOUT = 30  # seconds
+
+SANDBOX_USER = "65534:65534"  # nobody
+
+# Runs the interpreter in a fresh directory under /tmp
+_RUN_IN_FRESH_DIR = 'cd "$(mktemp -d)" && exec "$@"'
+
+# Wipes everything a snippet can leave behind in a pooled container: every process
+# except PID 1 (kill -1 spares the caller) and all writable scratch space
+_RESET_CONTAINER = "kill -9 -1; rm -rf /tmp/* /tmp/.[!.]* /dev/shm/* 2>/dev/null; true"
+
+# Arguments that make each interpreter read the program from stdin
+_STDIN_ARGS = {"python": ["-"], "node": ["-"], "sh": ["-s"]}
 
 class SecureCodeExecutor:
     """
@@ -29,97 +47,325 @@ class SecureCodeExecutor:
         timeout: int = DEFAULT_TIMEOUT,
         memory_limit: str = DEFAULT_MEMORY_LIMIT,
         network: str = DEFAULT_NETWORK,
-        logs_dir: str = "./logs"
+        logs_dir: str = "./logs",
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES
     ):
         self.timeout = timeout
         self.memory_limit = memory_limit
         self.network = network
         self.logs_dir = logs_dir
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        
+        # Idle (container_id, uses) pairs per image; containers are started on demand
+        self._pools: Dict[str, queue.Queue] = {}
+        self._pools_lock = threading.Lock()
         
         # Ensure logs directory exists
         os.makedirs(logs_dir, exist_ok=True)
+        
+        # Remove pooled containers on shutdown
+        atexit.register(self.close)
+    
+    async def execute_python_async(self, code: str) -> str:
+        """Execute Python code in a sandboxed environment"""
+        return await self._execute_in_container_async(code, "python:3.11-alpine", "python")
     
+    async def execute_javascript_async(self, code: str) -> str:
+        """Execute JavaScript code in a sandboxed environment"""
+        return await self._execute_in_container_async(code, "node:18-alpine", "node")
+    
+    async def execute_shell_async(self, code: str) -> str:
+        """Execute shell code in a sandboxed environment"""
+        return await self._execute_in_container_async(code, "alpine:latest", "sh")
+    
+    # Blocking wrappers; these start their own event loop, so call them only outside one
     def execute_python(self, code: str) -> str:
         """Execute Python code in a sandboxed environment"""
-        return self._execute_in_container(code, "python:3.11-alpine", "python", "py")
+        return asyncio.run(self.execute_python_async(code))
     
     def execute_javascript(self, code: str) -> str:
         """Execute JavaScript code in a sandboxed environment"""
-        return self._execute_in_container(code, "node:18-alpine", "node", "js")
+        return asyncio.run(self.execute_javascript_async(code))
     
     def execute_shell(self, code: str) -> str:
         """Execute shell code in a sandboxed environment"""
-        return self._execute_in_container(code, "alpine:latest", "sh", "sh")
+        return asyncio.run(self.execute_shell_async(code))
+    
+    def _limit_args(self) -> List[str]:
+        """Resource limits and scratch space applied to every sandbox container"""
+        return [
+            f"--memory={self.memory_limit}",  # Memory limit
+            f"--network={self.network}",  # Network access
+            "--cpus=0.5",  # CPU limit
+            "--pids-limit=50",  # Process limit
+            "--read-only",  # Only the scratch space below is writable
+            "--user", SANDBOX_USER,  # Unprivileged user
+            "--tmpfs", "/tmp:rw,size=16m",  # In-memory scratch space
+        ]
+    
+    def _pool(self, image: str) -> queue.Queue:
+        """Get the idle container queue for an image"""
+        with self._pools_lock:
+            pool = self._pools.get(image)
+            if pool is None:
+                pool = self._pools[image] = queue.Queue(maxsize=self.pool_size)
+            return pool
+    
+    def _start_container(self, image: str) -> Optional[str]:
+        """Start a long-lived sandbox container that idles until code is exec'd into it"""
+        docker_cmd = [
+            "docker", "run",
+            "-d",  # Detached
+            "--rm",  # Remove container once killed
+            *self._limit_args(),
+            "--entrypoint", "tail",  # Idle process available in every image
+            image,
+            "-f", "/dev/null"
+        ]
+        try:
+            result = subprocess.run(
+                docker_cmd,
+                capture_output=True,
+                text=True,
+                timeout=CONTAINER_START_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not start sandbox container for {image}: {str(e)}")
+            return None
+        
+        if result.returncode != 0:
+            logger.warning(f"Could not start sandbox container for {image}: {result.stderr.strip()}")
+            return None
+        
+        container_id = result.stdout.strip()
+        logger.info(f"Started sandbox container {container_id[:12]} for {image}")
+        return container_id
+    
+    def _kill_container(self, container_id: str) -> None:
+        """Force-remove a sandbox container"""
+        try:
+            subprocess.run(
+                ["docker", "rm", "-f", container_id],
+                capture_output=True,
+                timeout=CONTAINER_START_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"Error removing sandbox container {container_id[:12]}: {str(e)}")
+    
+    def _is_running(self, container_id: str) -> bool:
+        """Ask the daemon whether a container is still running"""
+        try:
+            result = subprocess.run(
+                ["docker", "inspect", "-f", "{{.State.Running}}", container_id],
+                capture_output=True,
+                text=True,
+                timeout=CONTAINER_START_TIMEOUT
+            )
+        except Exception:
+            return False
+        return result.returncode == 0 and result.stdout.strip() == "true"
+    
+    def _reset_container(self, container_id: str) -> bool:
+        """Kill leftover processes and wipe scratch space; False if the container is unusable"""
+        try:
+            result = subprocess.run(
+                ["docker", "exec", container_id, "sh", "-c", _RESET_CONTAINER],
+                capture_output=True,
+                timeout=CONTAINER_START_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"Error resetting sandbox container {container_id[:12]}: {str(e)}")
+            return False
+        return result.returncode == 0
+    
+    def _checkout(self, image: str) -> Optional[Tuple[str, int]]:
+        """Take an idle container for image, starting a new one if none is idle"""
+        try:
+            return self._pool(image).get_nowait()
+        except queue.Empty:
+            container_id = self._start_container(image)
+            return (container_id, 0) if container_id else None
+    
+    def _checkin(self, image: str, container_id: str, uses: int) -> None:
+        """Return a container to the pool, or remove it if worn out or the pool is full"""
+        if uses < self.max_uses:
+            try:
+                self._pool(image).put_nowait((container_id, uses))
+                return
+            except queue.Full:
+                pass
+        self._kill_container(container_id)
     
-    def _execute_in_container(self, code: str, image: str, interpreter: str, extension: str) -> str:
+    def close(self) -> None:
+        """Remove all idle pooled containers"""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    container_id, _ = pool.get_nowait()
+                except queue.Empty:
+                    break
+                self._kill_container(container_id)
+    
+    async def _run(self, docker_cmd: List[str], code: str) -> subprocess.CompletedProcess:
+        """
+        Run a docker command with code on stdin without blocking the event loop
+        
+        Raises:
+            subprocess.TimeoutExpired: if the command outlives self.timeout
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *docker_cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(code.encode("utf-8")),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(docker_cmd, self.timeout)
+        
+        return subprocess.CompletedProcess(
+            docker_cmd,
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace")
+        )
+    
+    def _format_output(self, result: subprocess.CompletedProcess) -> str:
+        """Combine stdout and stderr, truncating stdout if too large"""
+        stdout = result.stdout
+        stderr = result.stderr
+        
+        # Truncate output if too large
+        if len(stdout) > MAX_OUTPUT_SIZE:
+            stdout = stdout[:MAX_OUTPUT_SIZE] + "\n... (output truncated)"
+        
+        # Combine output
+        output = stdout
+        if stderr:
+            output += f"\nErrors:\n{stderr}"
+        return output
+    
+    async def _execute_in_container_async(self, code: str, image: str, interpreter: str) -> str:
         """
-        Execute code in a Docker container with resource limits
+        Execute code in a pooled container, or a fresh one if no container is available
+        
+        Args:
+            code: The code to execute
+            image: Docker image to use
+            interpreter: Command to run the code (python, node, sh)
+            
+        Returns:
+            Output from code execution
+        """
+        if self.pool_size > 0:
+            # Checking out may start a container, which blocks
+            container = await asyncio.to_thread(self._checkout, image)
+            if container is not None:
+                output = await self._execute_in_pooled(code, image, interpreter, *container)
+                if output is not None:
+                    return output
+        
+        return await self._execute_in_fresh_container(code, image, interpreter)
+    
+    async def _execute_in_pooled(self, code: str, image: str, interpreter: str, container_id: str, uses: int) -> Optional[str]:
+        """
+        Execute code with docker exec in an already running container
+        
+        Returns:
+            Output from code execution, or None if the container could not run it
+        """
+        exec_id = container_id[:12]
+        docker_cmd = [
+            "docker", "exec",
+            "-i",  # Program is fed on stdin
+            container_id,
+            "sh", "-c", _RUN_IN_FRESH_DIR, "sh",
+            interpreter,
+            *_STDIN_ARGS[interpreter]
+        ]
+        
+        logger.info(f"Executing code in pooled container: {exec_id}")
+        
+        try:
+            start_time = time.time()
+            result = await self._run(docker_cmd, code)
+            execution_time = time.time() - start_time
+        except subprocess.TimeoutExpired:
+            # The snippet may still be running inside the container, so discard it
+            await asyncio.to_thread(self._kill_container, container_id)
+            logger.warning(f"Code execution {exec_id} timed out after {self.timeout}s")
+            return f"Error: Code execution timed out after {self.timeout} seconds"
+        except Exception as e:
+            await asyncio.to_thread(self._kill_container, container_id)
+            logger.error(f"Error in code execution {exec_id}: {str(e)}")
+            return f"Error executing code: {str(e)}"
+        
+        if result.returncode != 0 and not await asyncio.to_thread(self._is_running, container_id):
+            # The container died (e.g. killed by its memory limit); retry in a fresh one
+            logger.warning(f"Sandbox container {exec_id} is no longer running")
+            await asyncio.to_thread(self._kill_container, container_id)
+            return None
+        
+        # Nothing from this snippet may be visible to the next one
+        if await asyncio.to_thread(self._reset_container, container_id):
+            await asyncio.to_thread(self._checkin, image, container_id, uses + 1)
+        else:
+            await asyncio.to_thread(self._kill_container, container_id)
+        
+        logger.info(f"Code execution {exec_id} completed in {execution_time:.2f}s with return code {result.returncode}")
+        
+        return self._format_output(result)
+    
+    async def _execute_in_fresh_container(self, code: str, image: str, interpreter: str) -> str:
+        """
+        Execute code in a new single-use Docker container with resource limits
         
         Args:
             code: The code to execute
             image: Docker image to use
             interpreter: Command to run the code (python, node, sh)
-            extension: File extension for the code
             
         Returns:
             Output from code execution
         """
         # Create a unique ID for this execution
         exec_id = str(uuid.uuid4())[:8]
+        container_name = f"torisai_exec_{exec_id}"
         
-        # Create a temporary file for the code
-        temp_dir = tempfile.mkdtemp(prefix=f"torisai_exec_{exec_id}_")
-        temp_file = os.path.join(temp_dir, f"code.{extension}")
+        # Prepare Docker command; the code is piped on stdin, so nothing touches the host disk
+        docker_cmd = [
+            "docker", "run",
+            "--rm",  # Remove container after execution
+            "-i",  # Program is fed on stdin
+            "--name", container_name,
+            *self._limit_args(),
+            "--workdir", "/tmp",  # Set working directory
+            image,  # Docker image
+            interpreter,  # Interpreter command
+            *_STDIN_ARGS[interpreter]
+        ]
         
         try:
-            # Write code to temporary file
-            with open(temp_file, "w") as f:
-                f.write(code)
-            
-            # Make file executable if it's a shell script
-            if extension == "sh":
-                os.chmod(temp_file, 0o755)
-            
-            # Prepare Docker command
-            docker_cmd = [
-                "docker", "run",
-                "--rm",  # Remove container after execution
-                f"--memory={self.memory_limit}",  # Memory limit
-                f"--network={self.network}",  # Network access
-                "--cpus=0.5",  # CPU limit
-                "--pids-limit=50",  # Process limit
-                "-v", f"{temp_dir}:/code",  # Mount code directory
-                "--workdir", "/code",  # Set working directory
-                image,  # Docker image
-                interpreter,  # Interpreter command
-                f"code.{extension}"  # Code file
-            ]
-            
             # Log the execution
             logger.info(f"Executing code in container: {exec_id}")
             
             # Execute the command with timeout
             start_time = time.time()
-            result = subprocess.run(
-                docker_cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            result = await self._run(docker_cmd, code)
             execution_time = time.time() - start_time
             
             # Prepare output
-            stdout = result.stdout
-            stderr = result.stderr
-            
-            # Truncate output if too large
-            if len(stdout) > MAX_OUTPUT_SIZE:
-                stdout = stdout[:MAX_OUTPUT_SIZE] + "\n... (output truncated)"
-            
-            # Combine output
-            output = stdout
-            if stderr:
-                output += f"\nErrors:\n{stderr}"
+            output = self._format_output(result)
             
             # Log execution details
             logger.info(f"Code execution {exec_id} completed in {execution_time:.2f}s with return code {result.returncode}")
@@ -127,21 +373,21 @@ class SecureCodeExecutor:
             return output
             
         except subprocess.TimeoutExpired:
+            # Killing the docker client does not stop the container itself
+            await asyncio.to_thread(self._kill_container, container_name)
             logger.warning(f"Code execution {exec_id} timed out after {self.timeout}s")
             return f"Error: Code execution timed out after {self.timeout} seconds"
             
         except Exception as e:
             logger.error(f"Error in code execution {exec_id}: {str(e)}")
             return f"Error executing code: {str(e)}"
-            
-        finally:
-            # Clean up temporary directory
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                logger.error(f"Error cleaning up temporary directory: {str(e)}")
 
-def execute_code(code: str, language: str = "python") -> str:
+# Shared executor so pooled containers are reused across calls
+@functools.lru_cache(maxsize=None)
+def _default_executor() -> SecureCodeExecutor:
+    return SecureCodeExecutor()
+
+async def execute_code_async(code: str, language: str = "python") -> str:
     """
     Execute code securely in a sandboxed environment
     
@@ -152,13 +398,27 @@ def execute_code(code: str, language: str = "python") -> str:
     Returns:
         Output from code execution
     """
-    executor = SecureCodeExecutor()
+    executor = _default_executor()
     
     if language.lower() == "python":
-        return executor.execute_python(code)
+        return await executor.execute_python_async(code)
     elif language.lower() in ["javascript", "js"]:
-        return executor.execute_javascript(code)
+        return await executor.execute_javascript_async(code)
     elif language.lower() in ["shell", "bash", "sh"]:
-        return executor.execute_shell(code)
+        return await executor.execute_shell_async(code)
     else:
         return f"Unsupported language: {language}"
+
+def execute_code(code: str, language: str = "python") -> str:
+    """
+    Execute code securely in a sandboxed environment
+    Blocking wrapper around execute_code_async; do not call it from a running event loop
+    
+    Args:
+        code: The code to execute
+        language: The programming language (python, javascript, shell)
+        
+    Returns:
+        Output from code execution
+    """
+    return asyncio.run(execute_code_async(code, language))
@@ -6,7 +6,10 @@ from typing import Dict, Any, List, Optional
 import logging
 import httpx
 import asyncio
-from bs4 import BeautifulSoup
+import functools
+import importlib.util
+import lxml.etree
+import lxml.html
 import re
 import json
 from pydantic import BaseModel, Field
@@ -15,6 +18,34 @@ from torisai.core.tool_protocol import registry, ToolDefinition
 
 logger = logging.getLogger("torisai.tools.web")
 
+USER_AGENT = "TORISAI/1.0 (Local AI Assistant)"
+
+# Bytes of a page read before parsing; far more than the 10000 characters returned
+MAX_PAGE_BYTES = 256 * 1024
+
+# Whitespace other than newlines, which separate the extracted lines
+_WS_RE = re.compile(r"[ \t\r\f\v]+")
+
+# Elements whose text is never page content
+_NON_CONTENT_TAGS = ("script", "style", "meta", "noscript", "svg")
+
+# Shared client so repeated searches and fetches reuse keep-alive connections;
+# HTTP/2 is enabled when the h2 package (httpx[http2]) is installed
+@functools.lru_cache(maxsize=None)
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=15.0,
+        headers={"User-Agent": USER_AGENT},
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+    )
+
+async def close():
+    """Close the shared HTTP client"""
+    if _client.cache_info().currsize:
+        await _client().aclose()
+        _client.cache_clear()
+
 class SearchResult(BaseModel):
     """Model for search results"""
     title: str
@@ -37,40 +68,39 @@ async def web_search(query: str, num_results: int = 5) -> List[SearchResult]:
         
         # Use a search API (this is a placeholder - in production would use a real search API)
         # For security and reliability, we'd use a proper search API with authentication
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://api.duckduckgo.com/",
-                params={
-                    "q": query,
-                    "format": "json",
-                    "no_html": "1",
-                    "no_redirect": "1"
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Search API error: {response.status_code}")
-                return []
+        response = await _client().get(
+            "https://api.duckduckgo.com/",
+            params={
+                "q": query,
+                "format": "json",
+                "no_html": "1",
+                "no_redirect": "1"
+            },
+            timeout=10.0
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"Search API error: {response.status_code}")
+            return []
+        
+        try:
+            data = response.json()
+            results = []
             
-            try:
-                data = response.json()
-                results = []
-                
-                # Process results
-                for result in data.get("Results", [])[:num_results]:
-                    results.append(
-                        SearchResult(
-                            title=result.get("Title", ""),
-                            url=result.get("FirstURL", ""),
-                            snippet=result.get("Text", "")
-                        )
+            # Process results
+            for result in data.get("Results", [])[:num_results]:
+                results.append(
+                    SearchResult(
+                        title=result.get("Title", ""),
+                        url=result.get("FirstURL", ""),
+                        snippet=result.get("Text", "")
                     )
-                
-                return results
-            except Exception as e:
-                logger.error(f"Error parsing search results: {str(e)}")
-                return []
+                )
+            
+            return results
+        except Exception as e:
+            logger.error(f"Error parsing search results: {str(e)}")
+            return []
     
     except Exception as e:
         logger.error(f"Error in web search: {str(e)}")
@@ -89,39 +119,39 @@ async def fetch_webpage(url: str) -> str:
     try:
         logger.info(f"Fetching webpage: {url}")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers={
-                    "User-Agent": "TORISAI/1.0 (Local AI Assistant)"
-                },
-                follow_redirects=True,
-                timeout=15.0
-            )
-            
+        async with _client().stream("GET", url, follow_redirects=True) as response:
             if response.status_code != 200:
                 logger.error(f"Webpage fetch error: {response.status_code}")
                 return f"Error: Could not fetch webpage (status code {response.status_code})"
             
-            # Parse HTML
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Remove scripts, styles, and other non-content elements
-            for element in soup(["script", "style", "meta", "noscript", "svg"]):
-                element.decompose()
-            
-            # Extract text
-            text = soup.get_text(separator="\n", strip=True)
-            
-            # Clean up text
-            text = re.sub(r"\n+", "\n", text)
-            text = re.sub(r"\s+", " ", text)
-            
-            # Truncate if too long
-            if len(text) > 10000:
-                text = text[:10000] + "...\n[Content truncated due to length]"
-            
-            return text
+            # Stop downloading once enough of the page is in hand to fill the output
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= MAX_PAGE_BYTES:
+                    break
+            charset = response.charset_encoding
+        
+        # Parse HTML; without a charset header lxml sniffs the <meta> declaration
+        parser = lxml.html.HTMLParser(encoding=charset) if charset else None
+        tree = lxml.html.fromstring(bytes(body[:MAX_PAGE_BYTES]), parser=parser)
+        
+        # Remove scripts, styles, and other non-content elements in one C-level pass
+        lxml.etree.strip_elements(tree, *_NON_CONTENT_TAGS, with_tail=False)
+        
+        # Extract text one line at a time, collapsing runs of spaces and dropping blank lines
+        lines = (
+            _WS_RE.sub(" ", line).strip()
+            for piece in tree.itertext()
+            for line in piece.split("\n")
+        )
+        text = "\n".join(line for line in lines if line)
+        
+        # Truncate if too long
+        if len(text) > 10000:
+            text = text[:10000] + "...\n[Content truncated due to length]"
+        
+        return text
     
     except Exception as e:
         logger.error(f"Error fetching webpage: {str(e)}")
@@ -144,7 +174,8 @@ registry.register(
             }
         },
         function=web_search,
-        requires_confirmation=False
+        requires_confirmation=False,
+        side_effect_free=True
     )
 )
 
@@ -159,6 +190,7 @@ registry.register(
             }
         },
         function=fetch_webpage,
-        requires_confirmation=False
+        requires_confirmation=False,
+        side_effect_free=True
     )
 )